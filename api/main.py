@@ -1,21 +1,43 @@
 from flask import Flask, request, jsonify, redirect, send_file, send_from_directory, session
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import PIL
 from PIL import Image
 from pillow_heif import register_heif_opener
 import os
 import html
 from PIL import ImageOps
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import queue
+import atexit
 from datetime import datetime
 from pathlib import Path
 import hashlib
+import mimetypes
 import json
+import copy
+import functools
+import threading
+import time
+import secrets
+import math
+import mmap
+import shutil
+import subprocess
+import stat
+from contextlib import ExitStack, contextmanager
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from werkzeug.utils import secure_filename
-from PIL import ExifTags
+from werkzeug.wsgi import FileWrapper
+from PIL import ExifTags, features
 from io import BytesIO
 from werkzeug.exceptions import HTTPException
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.http import HTTP_STATUS_CODES
+from werkzeug.security import check_password_hash, generate_password_hash, safe_join
 
 try:
     import pillow_avif  # noqa: F401
@@ -27,12 +49,66 @@ try:
 except Exception:
     rawpy = None
 
+try:
+    import piexif  # Optional fast EXIF reader (JPEG/TIFF/WebP)
+except Exception:
+    piexif = None
+
+try:
+    import orjson  # Optional faster JSON encoder/decoder
+except Exception:
+    orjson = None
+
+try:
+    import fcntl  # POSIX only: serializes .meta.json writes across server workers
+except ImportError:
+    fcntl = None
+
+try:
+    import pyvips  # Optional libvips bindings for JPG download renditions
+except Exception:
+    pyvips = None
+
+# Optional jpegli encoder CLI (from libjxl) for smaller JPG download renditions
+_CJPEGLI = shutil.which(os.environ.get("MIO_GALLERY_CJPEGLI", "cjpegli"))
+
 # Register HEIF opener for iPhone photos
 register_heif_opener()
 
+# Upload conversion workers are spawned and re-import this module: they only need the
+# imaging code, not the server's logging, banner, background threads or exit hooks.
+_IN_UPLOAD_WORKER = multiprocessing.parent_process() is not None
+
 debug_mode = False
 
+
+class _OrjsonProvider(DefaultJSONProvider):
+    """jsonify() through orjson; falls back to the stdlib encoder for anything orjson rejects."""
+
+    def _dump_bytes(self, obj) -> bytes:
+        try:
+            return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super().dumps(obj).encode("utf-8")
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dump_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dump_bytes(obj), mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
 CORS(app)
 app.secret_key = os.environ.get("MIO_GALLERY_SECRET", "dev-secret-change-me")
 
@@ -42,6 +118,7 @@ REPO_DIR = BASE_DIR.parent
 
 PHOTO_DIR = REPO_DIR / "photo"
 PHOTO_DIR.mkdir(parents=True, exist_ok=True)
+_PHOTO_DIR_STR = str(PHOTO_DIR)
 META_PATH = PHOTO_DIR / ".meta.json"
 DESCRIPTION_DIR = PHOTO_DIR / "description"
 DESCRIPTION_DIR.mkdir(parents=True, exist_ok=True)
@@ -49,29 +126,83 @@ THUMB_DIR = PHOTO_DIR / "thumb"
 THUMB_DIR.mkdir(parents=True, exist_ok=True)
 DOWNLOAD_DIR = PHOTO_DIR / "download"
 DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+MEDIUM_DIR = PHOTO_DIR / "medium"
+MEDIUM_DIR.mkdir(parents=True, exist_ok=True)
 PAGE_DIR = BASE_DIR / "page"
 
+# Let the front-end server send photo/ files: nginx (X-Accel-Redirect to an `internal` location
+# aliased to photo/) or Apache/lighttpd (X-Sendfile). Both off by default.
+X_ACCEL_PREFIX = os.environ.get("MIO_GALLERY_X_ACCEL_PREFIX", "").rstrip("/")
+app.use_x_sendfile = os.environ.get("MIO_GALLERY_X_SENDFILE", "") == "1"
+
 # Logging setup
 LOG_DIR = REPO_DIR / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
+def _start_log_listener(queue_handler: QueueHandler, handler: logging.Handler) -> None:
+    """Point queue_handler at a fresh queue drained by a new listener thread in this process."""
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    queue_handler.queue = log_queue
+
+
 def _init_logging():
+    # Ensure we don't add duplicate handlers if reloaded
+    if any(isinstance(h, QueueHandler) for h in app.logger.handlers):
+        return
     handler = RotatingFileHandler(LOG_DIR / "server.log", maxBytes=1_000_000, backupCount=3)
     fmt = logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
     handler.setFormatter(fmt)
-    # Ensure we don't add duplicate handlers if reloaded
-    existing = [h for h in app.logger.handlers if isinstance(h, RotatingFileHandler)]
-    if not existing:
-        app.logger.addHandler(handler)
+    # Request threads only enqueue records; a listener thread does the file I/O.
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    _start_log_listener(queue_handler, handler)
+    # Forked server workers (gunicorn --preload) inherit the handler but not the thread.
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=lambda: _start_log_listener(queue_handler, handler))
+    app.logger.addHandler(queue_handler)
     app.logger.setLevel(logging.INFO)
 
-_init_logging()
+
+if not _IN_UPLOAD_WORKER:
+    _init_logging()
+
+
+def _log_imaging_backend():
+    # Pillow-SIMD is a drop-in fork; its versions carry a ".postN" suffix.
+    simd = ".post" in PIL.__version__
+    app.logger.info("Pillow %s%s", PIL.__version__, " (SIMD build)" if simd else "")
+    # JPG downloads are encoded by Pillow's libjpeg; stock libjpeg is several times slower than turbo.
+    try:
+        turbo = features.check_feature("libjpeg_turbo")
+        jpeg_version = features.version("libjpeg_turbo") if turbo else features.version("jpg")
+    except Exception:
+        return
+    if turbo:
+        app.logger.info("JPEG codec: libjpeg-turbo %s", jpeg_version)
+    else:
+        app.logger.warning("JPEG codec: libjpeg %s (not libjpeg-turbo; JPG downloads will be slow)", jpeg_version)
+
+
+if not _IN_UPLOAD_WORKER:
+    _log_imaging_backend()
 
 ADMIN_PASSWORD = os.environ.get("MIO_GALLERY_PASSWORD", "Admin123")
+# Fixed-size digest so the login compare is constant-time and independent of password length.
+_ADMIN_PW_HASH = hashlib.blake2b(ADMIN_PASSWORD.encode("utf-8"), digest_size=32).digest()
 RAW_EXTENSIONS = {"cr2", "cr3", "nef", "arw", "orf", "raf", "rw2", "srw", "dng", "pef"}
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'webp', 'heic', 'heif', *RAW_EXTENSIONS}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+# Whole-request cap, enforced by Werkzeug before it spools the form (413): up front from
+# Content-Length, otherwise as soon as the limit is passed. This bounds what one request can
+# make the server receive; the per-file MAX_FILE_SIZE check only runs once the file has arrived.
+# The manage UI sends one file per request; the default fits two maximum-size files plus form overhead.
+_MAX_UPLOAD_MB = os.environ.get("MIO_GALLERY_MAX_UPLOAD_MB", "").strip()
+app.config["MAX_CONTENT_LENGTH"] = int(_MAX_UPLOAD_MB) * 1024 * 1024 if _MAX_UPLOAD_MB else 2 * MAX_FILE_SIZE + 1024 * 1024
 THUMB_MAX_BYTES = 30 * 1024  # 30KB
+Image.init()
+_AVIF_THUMBS = "AVIF" in Image.SAVE  # native (Pillow >= 11.2) or via pillow_avif
 
 
 def _is_admin() -> bool:
@@ -105,8 +236,9 @@ def _normalize_album_id(val) -> str | None:
     return s
 
 
-def _get_image_album_id(image_id: str) -> str | None:
-    meta = _load_meta()
+def _get_image_album_id(image_id: str, meta: dict | None = None) -> str | None:
+    if meta is None:
+        meta = _load_meta()
     mapping = _meta_get_image_album(meta)
     album_id = mapping.get(image_id)
     if not album_id:
@@ -119,10 +251,11 @@ def _get_image_album_id(image_id: str) -> str | None:
     return album_id if album_id in albums else None
 
 
-def _get_album_name(album_id: str | None) -> str | None:
+def _get_album_name(album_id: str | None, meta: dict | None = None) -> str | None:
     if not album_id:
         return None
-    meta = _load_meta()
+    if meta is None:
+        meta = _load_meta()
     albums = _meta_get_albums(meta)
     a = albums.get(album_id) if isinstance(albums, dict) else None
     if not isinstance(a, dict):
@@ -160,6 +293,37 @@ def _require_image_access_or_404(image_id: str):
     return jsonify({'error': 'Image not found'}), 404
 
 
+# Global error handler to log crashes and return consistent responses.
+# Registered before the routes (and the __main__ block) so it is active under `python main.py` too.
+# Error slugs for the JSON body, e.g. 404 -> "not_found"; werkzeug's names are static.
+_HTTP_ERROR_SLUGS = {code: name.lower().replace(' ', '_') for code, name in HTTP_STATUS_CODES.items()}
+
+
+def _handle_exception(e):
+    is_api = request.path.startswith('/api/')
+    # HTTP errors: log and return as JSON for API routes; preserve HTML for pages
+    if isinstance(e, HTTPException):
+        if app.logger.isEnabledFor(logging.WARNING):
+            app.logger.warning("HTTPException %s on %s %s: %s", e.code, request.method, request.path, e.description)
+        if is_api:
+            slug = _HTTP_ERROR_SLUGS.get(e.code) or (e.name or 'error').lower().replace(' ', '_')
+            return jsonify({'error': slug, 'message': e.description}), e.code
+        return e
+
+    # Unhandled exceptions: log stack trace
+    try:
+        app.logger.exception("Unhandled exception on %s %s", request.method, request.path)
+    except Exception:
+        pass
+
+    if is_api:
+        return jsonify({'error': 'internal_error', 'message': 'Server error'}), 500
+    return "Internal Server Error", 500
+
+
+app.register_error_handler(Exception, _handle_exception)
+
+
 @app.route('/', methods=['GET'])
 def serve_index_page():
         return send_from_directory(PAGE_DIR, 'index.html')
@@ -172,6 +336,40 @@ def serve_manage_page():
         return send_from_directory(PAGE_DIR, 'manage.html')
 
 
+def _load_photo_template():
+    """Read photo.html once, pre-split at <head> so each request only concatenates."""
+    try:
+        content = (PAGE_DIR / "photo.html").read_text(encoding="utf-8")
+    except Exception:
+        return None
+    head, sep, tail = content.partition("<head>")
+    return (head, tail) if sep else (content, None)
+
+
+_PHOTO_HTML = _load_photo_template()
+
+
+@functools.lru_cache(maxsize=2048)
+def _render_photo_meta(title: str, desc: str, img_url: str | None, page_url: str) -> str:
+    """OpenGraph/Twitter tags for a photo page. Keyed on the rendered values, so edits invalidate by themselves."""
+    title = html.escape(title)
+    desc = html.escape(desc[:280])
+    page_url = html.escape(page_url)
+    img_url = html.escape(img_url) if img_url else None
+    return f"""
+  <meta property=\"og:type\" content=\"article\" />
+  <meta property=\"og:title\" content=\"{title}\" />
+  <meta property=\"og:description\" content=\"{desc}\" />
+  {f'<meta property="og:image" content="{img_url}" />' if img_url else ''}
+  <meta property=\"og:url\" content=\"{page_url}\" />
+  <meta name=\"twitter:card\" content=\"summary_large_image\" />
+  <meta name=\"twitter:title\" content=\"{title}\" />
+  <meta name=\"twitter:description\" content=\"{desc}\" />
+  {f'<meta name="twitter:image" content="{img_url}" />' if img_url else ''}
+  <link rel=\"canonical\" href=\"{page_url}\" />
+"""
+
+
 @app.route('/photo/<image_id>', methods=['GET'])
 def serve_photo_page(image_id):
     if not _can_access_image(image_id):
@@ -194,40 +392,18 @@ def serve_photo_page(image_id):
     title = payload.get("datetime") or payload.get("date") or payload.get("id") or "Mio Gallery"
     desc = payload.get("description") or "Photo from Mio Gallery"
 
-    meta_block = f"""
-  <meta property=\"og:type\" content=\"article\" />
-  <meta property=\"og:title\" content=\"{html.escape(title)}\" />
-  <meta property=\"og:description\" content=\"{html.escape(desc[:280])}\" />
-  {f'<meta property="og:image" content="{html.escape(img_url)}" />' if img_url else ''}
-  <meta property=\"og:url\" content=\"{html.escape(page_url)}\" />
-  <meta name=\"twitter:card\" content=\"summary_large_image\" />
-  <meta name=\"twitter:title\" content=\"{html.escape(title)}\" />
-  <meta name=\"twitter:description\" content=\"{html.escape(desc[:280])}\" />
-  {f'<meta name="twitter:image" content="{html.escape(img_url)}" />' if img_url else ''}
-  <link rel=\"canonical\" href=\"{html.escape(page_url)}\" />
-"""
+    meta_block = _render_photo_meta(title, desc, img_url, page_url)
 
-    try:
-        html_content = (PAGE_DIR / "photo.html").read_text(encoding="utf-8")
-        html_content = html_content.replace("<head>", "<head>\n" + meta_block, 1)
-    except Exception:
+    if _PHOTO_HTML is None:
         return jsonify({'error': 'Page unavailable'}), 500
+    head, tail = _PHOTO_HTML
+    if tail is None:
+        return head
+    return head + "<head>\n" + meta_block + tail
 
-    return html_content
-
-
-@app.route('/manage-login', methods=['GET', 'POST'])
-def manage_login():
-        error = ""
-        if request.method == 'POST':
-                pw = (request.form.get('password') or '').strip()
-                if pw == ADMIN_PASSWORD:
-                        session['is_admin'] = True
-                        return redirect('/manage')
-                error = "Invalid password"
 
-        return (
-                """
+# Static login page, split around the error slot.
+_LOGIN_HTML_HEAD = """
 <!DOCTYPE html>
 <html lang=\"en\" data-rw-theme=\"light\">
     <head>
@@ -259,282 +435,853 @@ def manage_login():
                         <button class=\"btn primary\" type=\"submit\">Enter</button>
                     </div>
                     """
-                + (f"<div class=\\\"err\\\">{error}</div>" if error else "")
-                + """
+_LOGIN_HTML_TAIL = """
                 </form>
             </div>
         </div>
     </body>
 </html>
 """
-        )
+
+
+@app.route('/manage-login', methods=['GET', 'POST'])
+def manage_login():
+        error = ""
+        if request.method == 'POST':
+                pw = (request.form.get('password') or '').strip()
+                pw_hash = hashlib.blake2b(pw.encode("utf-8"), digest_size=32).digest()
+                if secrets.compare_digest(pw_hash, _ADMIN_PW_HASH):
+                        session['is_admin'] = True
+                        return redirect('/manage')
+                error = "Invalid password"
+
+        err_html = f'<div class="err">{error}</div>' if error else ""
+        return _LOGIN_HTML_HEAD + err_html + _LOGIN_HTML_TAIL
+
+
+# Parsed .meta.json (plus this process's unflushed changes), keyed by the file's
+# (st_mtime_ns, st_size) so edits by other workers or by hand are picked up.
+_META_CACHE = {"mtime": None, "data": {}}
+_META_LOCK = threading.Lock()
+_META_WRITE_LOCK = threading.Lock()  # held by _flush_meta across the write, never by readers
+# Changes saved in this process but not yet on disk, oldest first: (key, subkey, value).
+# subkey None replaces meta[key]; value _META_DELETE removes the entry.
+_META_OPS: list[tuple] = []
+_META_DELETE = object()
+_META_GEN = 0  # bumped by every _save_meta, so a reader never installs a view older than a save
+_META_FLUSH_TIMER = None
+_META_FLUSH_DELAY = 0.5  # seconds
+_META_RETRY_DELAY = 5.0  # seconds before retrying a failed write
+# Held (flock) by a worker while it re-reads, merges and replaces .meta.json.
+_META_LOCK_PATH = PHOTO_DIR / ".meta.lock"
+
+
+def _meta_diff(old: dict, new: dict) -> list[tuple]:
+    """Return the ops turning old into new, per entry of the top-level dicts (pinned, albums, ...)."""
+    ops = []
+    for key in old.keys() | new.keys():
+        old_v = old.get(key, _META_DELETE)
+        new_v = new.get(key, _META_DELETE)
+        if old_v is new_v:
+            continue
+        if isinstance(old_v, dict) and isinstance(new_v, dict):
+            for sub in old_v.keys() | new_v.keys():
+                sub_new = new_v.get(sub, _META_DELETE)
+                if old_v.get(sub, _META_DELETE) != sub_new:
+                    ops.append((key, sub, sub_new))
+        elif old_v != new_v:
+            ops.append((key, None, new_v))
+    return ops
+
+
+def _meta_apply(meta: dict, ops) -> dict:
+    """Apply ops to meta in place (meta must be private to the caller) and return it."""
+    for key, sub, value in ops:
+        if sub is None:
+            if value is _META_DELETE:
+                meta.pop(key, None)
+            else:
+                meta[key] = value
+            continue
+        d = meta.get(key)
+        if not isinstance(d, dict):
+            d = meta[key] = {}
+        if value is _META_DELETE:
+            d.pop(sub, None)
+        else:
+            d[sub] = value
+    return meta
+
+
+def _read_meta_file():
+    """Return ((st_mtime_ns, st_size), parsed dict) for .meta.json; (None, {}) if it is missing."""
+    try:
+        st = os.stat(META_PATH)
+    except FileNotFoundError:
+        return None, {}
+    raw = META_PATH.read_bytes()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return (st.st_mtime_ns, st.st_size), data if isinstance(data, dict) else {}
 
 
 def _load_meta():
-    if not META_PATH.exists():
-        return {}
+    """Return the parsed meta dict. Shared between requests: treat as read-only."""
+    global _META_CACHE
+    with _META_LOCK:
+        cache = _META_CACHE
+        ops = list(_META_OPS)
+        gen = _META_GEN
     try:
-        return json.loads(META_PATH.read_text(encoding="utf-8"))
+        st = os.stat(META_PATH)
+    except FileNotFoundError:
+        return _meta_apply({}, ops) if ops else {}
+    except OSError:
+        return cache["data"] if ops else {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    if cache["mtime"] == stamp:
+        return cache["data"]
+    try:
+        raw = META_PATH.read_bytes()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
     except Exception:
-        return {}
+        return cache["data"] if ops else {}
+    if not isinstance(data, dict):
+        data = {}
+    # Another worker wrote the file: its changes plus our own unflushed ones.
+    data = _meta_apply(data, ops)
+    with _META_LOCK:
+        # A save that landed while we were reading is newer than this view: keep it.
+        if gen != _META_GEN:
+            return _META_CACHE["data"]
+        _META_CACHE = {"mtime": stamp, "data": data}
+    return data
+
+
+_META_VIEWS = {"meta": None, "views": None}
+
+
+def _meta_views(meta: dict | None = None) -> dict:
+    """Normalized lookups derived from meta, built once per meta version. Read-only.
+
+    Keys: pinned, datetime, image_album (id -> album id, known albums only), album_names.
+    """
+    global _META_VIEWS
+    if meta is None:
+        meta = _load_meta()
+    cached = _META_VIEWS
+    if cached["meta"] is meta:
+        return cached["views"]
+
+    pinned = meta.get("pinned") if isinstance(meta, dict) else None
+    datetime_map = meta.get("datetime") if isinstance(meta, dict) else None
+    albums = _meta_get_albums(meta)
+    image_album = {}
+    for image_id, album_id in _meta_get_image_album(meta).items():
+        album_id = str(album_id).strip() if album_id else None
+        # Unknown album ids (e.g. album deleted) => public
+        if album_id and album_id in albums:
+            image_album[image_id] = album_id
+    views = {
+        "pinned": pinned if isinstance(pinned, dict) else {},
+        "datetime": datetime_map if isinstance(datetime_map, dict) else {},
+        "image_album": image_album,
+        "album_names": {aid: a.get("name") if isinstance(a, dict) else None for aid, a in albums.items()},
+    }
+    # _save_meta swaps in a new dict rather than mutating, so identity marks the version.
+    _META_VIEWS = {"meta": meta, "views": views}
+    return views
+
+
+class _MetaDraft(dict):
+    """A handler's private copy of meta; remembers the version it was copied from."""
+    base = None
+
+
+def _load_meta_for_update() -> dict:
+    """Return a private copy of the meta dict for handlers that mutate and save it."""
+    meta = _load_meta()
+    draft = _MetaDraft(copy.deepcopy(meta) if isinstance(meta, dict) else {})
+    draft.base = meta if isinstance(meta, dict) else {}
+    return draft
+
+
+def _arm_meta_flush(delay: float) -> None:
+    """Start the flush timer unless one is pending. Caller holds _META_LOCK."""
+    global _META_FLUSH_TIMER
+    if _META_FLUSH_TIMER is None:
+        timer = threading.Timer(delay, _flush_meta)
+        timer.daemon = True
+        timer.start()
+        _META_FLUSH_TIMER = timer
+
+
+def _save_meta(meta: dict, flush: bool = False):
+    """Make meta current in memory now; .meta.json is written shortly after, coalescing bursts.
+
+    Only what changed relative to the current meta is recorded, and merged into a fresh read of
+    the file when it is written, so workers don't overwrite each other's changes.
+    flush=True writes before returning: use it for changes that decide who may see an image
+    (uploads, album assignment, album passwords), so they don't wait on the timer.
+    """
+    global _META_CACHE, _META_GEN
+    # Diff against the version the handler started from: anything another worker changed
+    # since then is not this handler's change and must not be written back.
+    base = getattr(meta, "base", None)
+    if base is not None:
+        meta.base = None  # don't keep every old version alive through the cache
+    with _META_LOCK:
+        current = _META_CACHE["data"]
+        ops = _meta_diff(current if base is None else base, meta)
+        if base is not None and base is not current:
+            # The cache moved on (another worker wrote) since the handler loaded: keep that.
+            meta = _meta_apply(copy.deepcopy(current), ops)
+        _META_CACHE = {"mtime": _META_CACHE["mtime"], "data": meta}
+        _META_GEN += 1
+        if not ops:
+            return
+        _META_OPS.extend(ops)
+        if not flush:
+            _arm_meta_flush(_META_FLUSH_DELAY)
+    if flush:
+        _flush_meta()
+
+
+@contextmanager
+def _meta_file_lock():
+    """Hold an exclusive flock shared by every worker using this photo dir (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    with open(_META_LOCK_PATH, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _flush_meta():
+    """Merge pending meta changes into .meta.json (re-read under a file lock, tmp + rename)."""
+    global _META_CACHE, _META_FLUSH_TIMER
+    # Serializes this process's writers; readers and _save_meta only take _META_LOCK,
+    # which is held just long enough to snapshot the pending ops.
+    with _META_WRITE_LOCK:
+        with _META_LOCK:
+            _META_FLUSH_TIMER = None
+            if not _META_OPS:
+                return
+            ops = list(_META_OPS)
+            fallback = _META_CACHE["data"]
+        try:
+            with _meta_file_lock():
+                try:
+                    _, meta = _read_meta_file()
+                except ValueError:
+                    # Unparseable file: rebuild it from what this process last saw.
+                    app.logger.exception("Ignoring unreadable %s", META_PATH)
+                    meta = copy.deepcopy(fallback)
+                meta = _meta_apply(meta, ops)
+                tmp = META_PATH.with_suffix(META_PATH.suffix + ".tmp")
+                if orjson is not None:
+                    data = orjson.dumps(meta, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+                else:
+                    data = json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8")
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                    # Runs on the flush timer, off the request path: make the rename durable.
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, META_PATH)
+                st = os.stat(META_PATH)
+        except OSError:
+            # Keep the ops and try again later; meanwhile readers see them applied in memory.
+            app.logger.exception("Failed to write %s; retrying in %.0fs", META_PATH, _META_RETRY_DELAY)
+            with _META_LOCK:
+                _arm_meta_flush(_META_RETRY_DELAY)
+            return
+        with _META_LOCK:
+            # Ops saved during the write stay pending (they have their own timer or flush).
+            del _META_OPS[:len(ops)]
+            _META_CACHE = {"mtime": (st.st_mtime_ns, st.st_size), "data": _meta_apply(meta, _META_OPS)}
+
+
+if not _IN_UPLOAD_WORKER:
+    atexit.register(_flush_meta)
+
+
+# id -> {lowercased suffix: file} under photo/YYYY/MM. Each month dir is rescanned only when its mtime changes.
+_ID_INDEX: dict[str, dict[str, Path]] = {}
+_ID_INDEX_MTIMES: dict[str, int] = {}  # month dir path -> st_mtime_ns at last scan
+_ID_INDEX_MONTHS: dict[str, set[str]] = {}  # month dir path -> ids indexed from it
+_ID_LIST_ENTRIES: dict[str, dict] = {}  # id -> listing fields derived from _ID_INDEX (URLs, filename date)
+_ID_INDEX_LOCK = threading.Lock()
+# Month dirs are re-stat'ed at most this often; this process's own uploads/deletes update the index directly.
+_ID_INDEX_TTL = float(os.environ.get("MIO_GALLERY_INDEX_TTL", "2"))
+_ID_INDEX_CHECKED = None  # time.monotonic() of the last revalidation
+
+
+def _list_month_dirs() -> dict[str, int]:
+    """Return {month dir path: st_mtime_ns} for photo/YYYY/MM."""
+    months = {}
+    try:
+        with os.scandir(PHOTO_DIR) as years:
+            year_paths = [e.path for e in years if e.name.isdigit() and e.is_dir()]
+    except OSError:
+        return months
+    for year_path in year_paths:
+        try:
+            with os.scandir(year_path) as it:
+                for e in it:
+                    if e.name.isdigit() and e.is_dir():
+                        months[e.path] = e.stat().st_mtime_ns
+        except OSError:
+            continue
+    return months
+
+
+def _index_drop_month(month_path: str) -> None:
+    for image_id in _ID_INDEX_MONTHS.pop(month_path, ()):
+        _ID_LIST_ENTRIES.pop(image_id, None)
+        keep = {s: p for s, p in _ID_INDEX.get(image_id, {}).items() if str(p.parent) != month_path}
+        if keep:
+            _ID_INDEX[image_id] = keep
+        else:
+            _ID_INDEX.pop(image_id, None)
+    _ID_INDEX_MTIMES.pop(month_path, None)
+
+
+def _scan_month_files(month_path: str) -> list[tuple[str, str]]:
+    """Return (file name, path) for the image files in one month dir. Touches no shared state."""
+    try:
+        with os.scandir(month_path) as it:
+            return [(e.name, e.path) for e in it if not e.name.startswith('.') and e.is_file()]
+    except OSError:
+        return []
+
+
+def _index_scan_month(month_path: str, mtime_ns: int, files: list[tuple[str, str]]) -> None:
+    ids = set()
+    for name, path in files:
+        image_id, suffix = os.path.splitext(name)
+        _ID_INDEX.setdefault(image_id, {}).setdefault(suffix.lower(), Path(path))
+        ids.add(image_id)
+    _ID_INDEX_MONTHS[month_path] = ids
+    _ID_INDEX_MTIMES[month_path] = mtime_ns
+
+
+# Cold start (or many changed months): list month dirs from a few threads; scandir releases the GIL.
+_INDEX_SCAN_PARALLEL_MIN = 8
+
+
+def _refresh_id_index() -> None:
+    months = _list_month_dirs()
+    for month_path in [m for m in _ID_INDEX_MTIMES if m not in months]:
+        _index_drop_month(month_path)
+    changed = [m for m, mtime_ns in months.items() if _ID_INDEX_MTIMES.get(m) != mtime_ns]
+    if len(changed) >= _INDEX_SCAN_PARALLEL_MIN:
+        workers = min(32, len(changed), (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index-scan") as ex:
+            scans = list(ex.map(_scan_month_files, changed))
+    else:
+        scans = [_scan_month_files(m) for m in changed]
+    # Merge on this thread: the index dicts are only ever mutated under _ID_INDEX_LOCK.
+    for month_path, files in zip(changed, scans):
+        _index_drop_month(month_path)
+        _index_scan_month(month_path, months[month_path], files)
 
 
-def _save_meta(meta: dict):
-    tmp = META_PATH.with_suffix(META_PATH.suffix + ".tmp")
-    tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
-    tmp.replace(META_PATH)
+def _index_add_files(image_id: str, paths) -> None:
+    """Record freshly written files so lookups see them without a rescan."""
+    with _ID_INDEX_LOCK:
+        _ID_LIST_ENTRIES.pop(image_id, None)
+        formats = _ID_INDEX.setdefault(image_id, {})
+        for p in paths:
+            p = Path(p)
+            formats.setdefault(p.suffix.lower(), p)
+            _ID_INDEX_MONTHS.setdefault(str(p.parent), set()).add(image_id)
+
+
+def _index_forget(image_id: str) -> None:
+    with _ID_INDEX_LOCK:
+        _ID_LIST_ENTRIES.pop(image_id, None)
+        for p in _ID_INDEX.pop(image_id, {}).values():
+            _ID_INDEX_MONTHS.get(str(p.parent), set()).discard(image_id)
+
+
+def _revalidate_id_index() -> None:
+    """Rescan changed month dirs if the TTL has passed. Caller holds _ID_INDEX_LOCK."""
+    global _ID_INDEX_CHECKED
+    now = time.monotonic()
+    if _ID_INDEX_CHECKED is None or now - _ID_INDEX_CHECKED >= _ID_INDEX_TTL:
+        _refresh_id_index()
+        _ID_INDEX_CHECKED = now
+
+
+def _find_formats_by_id(image_id: str) -> dict[str, Path]:
+    """Return {'.webp': path, '.avif': path, ...} for an image id (empty if unknown)."""
+    with _ID_INDEX_LOCK:
+        _revalidate_id_index()
+        return dict(_ID_INDEX.get(image_id, {}))
 
 
 def _find_files_by_id(image_id: str):
-    matches = []
-    if not PHOTO_DIR.exists():
-        return matches
-    for p in PHOTO_DIR.rglob("*"):
-        if p.is_file() and p.stem == image_id:
-            matches.append(p)
-    return matches
+    return list(_find_formats_by_id(image_id).values())
 
 
 def _description_path(image_id: str) -> Path:
     # image_id comes from filename stem we generated; keep it simple and local.
-    safe = Path(image_id).name
+    safe = os.path.basename(image_id)
     return DESCRIPTION_DIR / f"{safe}.txt"
 
 
-def _load_description(image_id: str) -> str:
-    p = _description_path(image_id)
-    if not p.exists():
-        return ""
+# {id: description} for every photo/description/*.txt, keyed by the directory mtime.
+# Saves go through tmp + rename, which always bumps the directory mtime.
+_DESC_CACHE = {"mtime": None, "data": {}}
+_DESC_LOCK = threading.Lock()
+
+
+def _description_cache() -> dict[str, str]:
+    global _DESC_CACHE
     try:
-        return p.read_text(encoding="utf-8")
-    except Exception:
-        return ""
+        mtime = DESCRIPTION_DIR.stat().st_mtime_ns
+    except OSError:
+        return {}
+    cache = _DESC_CACHE
+    if cache["mtime"] == mtime:
+        return cache["data"]
+
+    data = {}
+    try:
+        with os.scandir(DESCRIPTION_DIR) as it:
+            for entry in it:
+                image_id, ext = os.path.splitext(entry.name)
+                if ext != ".txt":
+                    continue
+                try:
+                    with open(entry.path, encoding="utf-8") as f:
+                        data[image_id] = f.read()
+                except Exception:
+                    continue
+    except OSError:
+        return {}
+    _DESC_CACHE = {"mtime": mtime, "data": data}
+    return data
+
+
+def _load_description(image_id: str) -> str:
+    return _description_cache().get(os.path.basename(image_id), "")
+
+
+def _load_descriptions(image_ids) -> dict[str, str]:
+    """Descriptions for many ids at once (missing ids are omitted)."""
+    cache = _description_cache()
+    return {i: cache[i] for i in image_ids if i in cache}
 
 
 def _save_description(image_id: str, text: str) -> None:
+    global _DESC_CACHE
     p = _description_path(image_id)
     text = (text or "").strip()
-    if not text:
+    with _DESC_LOCK:
+        data = dict(_description_cache())
+        if not text:
+            try:
+                p.unlink(missing_ok=True)
+            except Exception:
+                pass
+            data.pop(p.stem, None)
+        else:
+            tmp = p.with_suffix(p.suffix + ".tmp")
+            tmp.write_text(text, encoding="utf-8")
+            tmp.replace(p)
+            data[p.stem] = text
         try:
-            p.unlink(missing_ok=True)
-        except Exception:
+            _DESC_CACHE = {"mtime": DESCRIPTION_DIR.stat().st_mtime_ns, "data": data}
+        except OSError:
             pass
-        return
 
-    tmp = p.with_suffix(p.suffix + ".tmp")
-    tmp.write_text(text, encoding="utf-8")
-    tmp.replace(p)
+
+def _write_atomic(path: Path, data) -> None:
+    """Write data next to path under a hidden tmp name, then rename: readers never see a partial file."""
+    # Dot-prefixed so the month-dir index scan skips it.
+    tmp = path.with_name(f".{path.name}.{secrets.token_hex(4)}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
 
-def _thumb_path(image_id: str) -> Path:
-    safe = Path(image_id).name
-    return THUMB_DIR / f"{safe}.webp"
+def _thumb_path(image_id: str, fmt: str = "webp") -> Path:
+    safe = os.path.basename(image_id)
+    return THUMB_DIR / f"{safe}.{fmt}"
 
 
 def _download_jpg_path(image_id: str) -> Path:
-    safe = Path(image_id).name
+    safe = os.path.basename(image_id)
     return DOWNLOAD_DIR / f"{safe}.jpg"
 
 
-def _pick_source_file(image_id: str) -> Path | None:
-    files = _find_files_by_id(image_id)
-    if not files:
-        return None
+def _medium_path(image_id: str) -> Path:
+    safe = os.path.basename(image_id)
+    return MEDIUM_DIR / f"{safe}.webp"
+
+
+def _pick_from_formats(formats: dict[str, Path]) -> Path | None:
     # Prefer AVIF if readable, else WebP.
-    avif = next((p for p in files if p.suffix.lower() == ".avif"), None)
-    webp = next((p for p in files if p.suffix.lower() == ".webp"), None)
-    return avif or webp or files[0]
+    return formats.get(".avif") or formats.get(".webp") or next(iter(formats.values()), None)
+
+
+def _pick_source_file(image_id: str) -> Path | None:
+    return _pick_from_formats(_find_formats_by_id(image_id))
 
 
 def _apply_exif_orientation(img: Image.Image) -> Image.Image:
     """Apply EXIF orientation to image, returning rotated/mirrored image if needed."""
     try:
+        orientation = img.getexif().get(0x0112, 1)
+    except Exception:
+        return img
+    # Upright (or bogus) orientation: exif_transpose would still copy the pixels.
+    if orientation not in (2, 3, 4, 5, 6, 7, 8):
+        return img
+    try:
+        # Let Pillow rotate so it also resets the Orientation tag kept in img.info.
         return ImageOps.exif_transpose(img)
     except Exception:
         # exif_transpose fails gracefully on images without EXIF; just return original
         return img
 
 
-def _open_image_any(path: Path) -> Image.Image:
-    """Open standard images or RAW files (if rawpy is installed)."""
-    try:
-        img = Image.open(path)
-        img.load()
+def _to_rgb_on_white(img: Image.Image) -> Image.Image:
+    """Flatten any alpha onto white and return an RGB image (unchanged if already RGB)."""
+    if img.mode == "RGB":
         return img
-    except Exception:
-        if rawpy is None:
-            raise
-        raw = rawpy.imread(str(path))
+    if img.mode not in ("RGBA", "LA", "P"):
+        return img.convert("RGB")
+    if img.mode == "P":
+        img = img.convert("RGBA")
+    # getchannel() extracts just the alpha band; split() would copy every band.
+    alpha = img.getchannel("A")
+    if alpha.getextrema()[0] == 255:
+        # Fully opaque (typical for decoded AVIF/WebP): dropping alpha is the whole job.
+        return img.convert("RGB")
+    bg = Image.new("RGB", img.size, (255, 255, 255))
+    bg.paste(img, mask=alpha)
+    return bg
+
+
+_MMAP_MIN_BYTES = 64 * 1024
+
+
+@contextmanager
+def _open_mapped(path):
+    """Image.open() over a read-only mmap so only the pages the decoder touches are read."""
+    if os.path.getsize(path) < _MMAP_MIN_BYTES:
+        with Image.open(path) as img:
+            yield img
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with Image.open(mm) as img:
+            yield img
+
+
+@contextmanager
+def _open_image_any(path: Path):
+    """Open standard images or RAW files (if rawpy is installed), fully loaded."""
+    with ExitStack() as stack:
         try:
-            rgb = raw.postprocess(output_bps=8, use_camera_wb=True, no_auto_bright=True)
-        finally:
-            raw.close()
-        return Image.fromarray(rgb)
+            img = stack.enter_context(_open_mapped(path))
+            img.load()
+        except Exception:
+            if rawpy is None:
+                raise
+            raw = rawpy.imread(str(path))
+            try:
+                rgb = raw.postprocess(output_bps=8, use_camera_wb=True, no_auto_bright=True)
+            finally:
+                raw.close()
+            img = Image.fromarray(rgb)
+            stack.callback(img.close)
+        yield img
+
+
+_THUMB_Q_HI = 76
+_THUMB_Q_LO = 36
+
 
+def _encode_thumb_webp(img: Image.Image, max_bytes: int) -> BytesIO:
+    """Pick a thumbnail quality in [36, 76] with few encodes; the final one uses method=6.
 
-def _ensure_thumbnail(image_id: str) -> Path | None:
-    """Create WebP thumbnail capped at ~50KB (best effort)."""
-    out_path = _thumb_path(image_id)
+    Probes (method=0) at both ends, then interpolates: WebP size is close to linear in
+    quality over this range. Returns the lowest-quality encode if nothing fits.
+    """
+    def _probe(q):
+        buf = BytesIO()
+        img.save(buf, format="WEBP", quality=q, method=0)
+        return buf
+
+    def _final(q, probe):
+        buf = BytesIO()
+        img.save(buf, format="WEBP", quality=q, method=6)
+        # method=6 is normally smaller; keep the probe if it isn't and that busts the cap.
+        return buf if buf.tell() <= max(probe.tell(), max_bytes) else probe
+
+    hi = _probe(_THUMB_Q_HI)
+    if hi.tell() <= max_bytes:
+        return _final(_THUMB_Q_HI, hi)
+    lo = _probe(_THUMB_Q_LO)
+    if lo.tell() > max_bytes:
+        return _final(_THUMB_Q_LO, lo)
+
+    span = hi.tell() - lo.tell()
+    q = _THUMB_Q_LO
+    if span > 0:
+        q += int((_THUMB_Q_HI - _THUMB_Q_LO) * (max_bytes - lo.tell()) / span)
+    q = min(_THUMB_Q_HI - 1, max(_THUMB_Q_LO, q))
+    # The estimate can be slightly optimistic: walk down from it (pathological curves end at q=36).
+    while q > _THUMB_Q_LO:
+        buf = _probe(q)
+        if buf.tell() <= max_bytes:
+            return _final(q, buf)
+        q = max(_THUMB_Q_LO, q - 4)
+    return _final(_THUMB_Q_LO, lo)
+
+
+_THUMB_MAX_SIDE = 640
+_MEDIUM_MAX_SIDE = 1280
+_THUMB_MIN_SIDE = 240
+
+
+def _encode_thumb_avif(img: Image.Image, max_bytes: int) -> BytesIO:
+    # AVIF is ~30% smaller than WebP at the same look, so the top quality usually fits first try.
+    return _encode_capped(img, "AVIF", (60, 50, 40, 30), max_bytes, speed=6, subsampling="4:2:0")
+
+
+def _write_thumbnail(img: Image.Image, out_path: Path) -> Path:
+    """Encode an upright RGB image as a thumbnail capped at ~30KB (best effort). Resizes img in place.
+
+    The format follows out_path: .webp or .avif.
+    """
+    encode = _encode_thumb_avif if out_path.suffix == ".avif" else _encode_thumb_webp
+    max_side = _THUMB_MAX_SIDE
+    min_side = _THUMB_MIN_SIDE
+
+    # Resize once; every smaller size is resampled from this base, never from a copy.
+    img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    base = img
+
+    while True:
+        buf = encode(img, THUMB_MAX_BYTES)
+        if buf.tell() <= THUMB_MAX_BYTES:
+            _write_atomic(out_path, buf.getbuffer())
+            return out_path
+
+        if max_side <= min_side:
+            # Give up and write the best we have.
+            _write_atomic(out_path, buf.getbuffer())
+            return out_path
+
+        # Reduce dimensions and try again. Size scales with pixel count, so shrink each side
+        # by the square root of the overshoot (with some margin) to land in one step.
+        scale = 0.95 * math.sqrt(THUMB_MAX_BYTES / buf.tell())
+        max_side = max(min_side, min(max_side - 16, int(max_side * scale)))
+        scale = max_side / max(base.size)
+        if scale < 1:
+            new_size = (max(1, round(base.width * scale)), max(1, round(base.height * scale)))
+            img = base.resize(new_size, Image.Resampling.LANCZOS)
+
+
+def _ensure_thumbnail_from_image(image_id: str, img: Image.Image) -> Path | None:
+    """Write the WebP (and AVIF) thumbnails from an already decoded, upright RGB image (upload path).
+
+    Resizes img in place. Returns the WebP path.
+    """
+    # Shrink once; the AVIF encode gets its own copy of the (small) result.
+    img.thumbnail((_THUMB_MAX_SIDE, _THUMB_MAX_SIDE), Image.Resampling.LANCZOS)
+    if _AVIF_THUMBS:
+        try:
+            _write_thumbnail(img.copy(), _thumb_path(image_id, "avif"))
+        except Exception:
+            pass
+    try:
+        return _write_thumbnail(img, _thumb_path(image_id))
+    except Exception:
+        return None
+
+
+def _ensure_thumbnail(image_id: str, fmt: str = "webp") -> Path | None:
+    """Create a WebP (or AVIF) thumbnail capped at ~30KB (best effort)."""
+    out_path = _thumb_path(image_id, fmt)
     if out_path.exists():
         return out_path
 
-    src_path = _pick_source_file(image_id)
+    # The medium rendition (when there is one) is 4-9x fewer pixels to decode and resample.
+    src_path = _medium_path(image_id)
+    if not src_path.exists():
+        src_path = _pick_source_file(image_id)
     if not src_path or not src_path.exists():
         return None
 
     try:
-        with Image.open(src_path) as img:
+        with _open_mapped(src_path) as img:
+            # JPEG: decode at 1/2, 1/4 or 1/8 scale straight from the DCT (no-op for other formats).
+            # The box is square, so it holds whichever way EXIF rotates the image.
+            img.draft("RGB", (_THUMB_MAX_SIDE, _THUMB_MAX_SIDE))
             img = _apply_exif_orientation(img)
-            if img.mode in ("RGBA", "LA", "P"):
-                bg = Image.new("RGB", img.size, (255, 255, 255))
-                if img.mode == "P":
-                    img = img.convert("RGBA")
-                bg.paste(img, mask=img.split()[-1] if img.mode in ("RGBA", "LA") else None)
-                img = bg
-            elif img.mode != "RGB":
-                img = img.convert("RGB")
-
-            max_side = 640
-            min_side = 240
-            quality = 76
-
-            while True:
-                trial = img.copy()
-                trial.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            img = _to_rgb_on_white(img)
+            return _write_thumbnail(img, out_path)
 
-                buf = BytesIO()
-                trial.save(buf, format="WEBP", quality=quality, method=6)
-                size = buf.tell()
+    except Exception:
+        return None
 
-                if size <= THUMB_MAX_BYTES:
-                    out_path.write_bytes(buf.getvalue())
-                    return out_path
 
-                if quality > 40:
-                    quality -= 8
-                    continue
+def _accepts_avif() -> bool:
+    # Only an explicit image/avif counts: */* alone (curl, old browsers) keeps getting WebP.
+    return any(value == "image/avif" and q > 0 for value, q in request.accept_mimetypes)
 
-                if max_side <= min_side:
-                    # Give up and write the best we have.
-                    out_path.write_bytes(buf.getvalue())
-                    return out_path
 
-                # Reduce dimensions and try again.
-                max_side = max(min_side, int(max_side * 0.85))
-                quality = 76
+# Ids whose AVIF thumbnail could not be made in this process; they get WebP without retrying.
+# Insertion-ordered dict used as a bounded set: the oldest entries are dropped past the cap.
+_AVIF_THUMB_FAILED: dict[str, None] = {}
+_AVIF_THUMB_FAILED_MAX = 4096
 
-    except Exception:
+
+def _find_or_make_thumbnail(image_id: str, fmt: str) -> Path | None:
+    p = _thumb_path(image_id, fmt)
+    if p.exists():
+        return p
+    if fmt == "avif" and image_id in _AVIF_THUMB_FAILED:
+        return None
+    if not _find_formats_by_id(image_id):
         return None
+    p = _ensure_thumbnail(image_id, fmt)
+    if p and p.exists():
+        return p
+    if fmt == "avif":
+        _AVIF_THUMB_FAILED[image_id] = None
+        while len(_AVIF_THUMB_FAILED) > _AVIF_THUMB_FAILED_MAX:
+            _AVIF_THUMB_FAILED.pop(next(iter(_AVIF_THUMB_FAILED)), None)
+    return None
 
 
 @app.route('/api/thumb/<image_id>.webp', methods=['GET'])
 def serve_thumbnail(image_id):
-    """Serve (and lazily generate) a small WebP thumbnail for grid previews."""
+    """Serve (and lazily generate) a small thumbnail for grid previews: AVIF when the client asks for it, else WebP."""
     guard = _require_image_access_or_404(image_id)
     if guard:
         return guard
 
-    files = _find_files_by_id(image_id)
-    if not files:
-        return jsonify({'error': 'Image not found'}), 404
-
-    p = _ensure_thumbnail(image_id)
-    if not p or not p.exists():
-        return jsonify({'error': 'Thumbnail not available'}), 404
-
-    from flask import send_from_directory
-    return send_from_directory(THUMB_DIR, p.name)
+    fmt = "webp"
+    p = None
+    if _AVIF_THUMBS and _accepts_avif():
+        p = _find_or_make_thumbnail(image_id, "avif")
+        if p:
+            fmt = "avif"
+    if p is None:
+        p = _find_or_make_thumbnail(image_id, "webp")
+        if p is None:
+            if not _find_formats_by_id(image_id):
+                return jsonify({'error': 'Image not found'}), 404
+            return jsonify({'error': 'Thumbnail not available'}), 404
+
+    # Ids are content hashes, so a thumbnail never changes once written: immutable caching,
+    # and the same front-end offload (X-Accel-Redirect / X-Sendfile) as full-size images.
+    resp = _send_photo(p, image_id, mimetype=f"image/{fmt}")
+    if _AVIF_THUMBS:
+        resp.vary.add("Accept")
+    return resp
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def get_image_date(image_path):
-    """Extract photo shot date from EXIF data"""
+# Suffixes piexif can read EXIF from without decoding the image.
+# piexif seeks straight to APP1 in JPEGs, but reads TIFF and WebP files whole; WebP goes
+# through _webp_exif_chunk instead, TIFF-based files through Pillow (mmap reads only the IFD pages).
+_PIEXIF_SUFFIXES = {'.jpg', '.jpeg', '.webp'}
+
+
+def _webp_exif_chunk(image_path) -> bytes | None:
+    """Return the EXIF chunk of a WebP file, seeking over the other RIFF chunks (image data)."""
+    with open(image_path, "rb") as f:
+        header = f.read(12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+            raise ValueError("not a WebP file")
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            size = int.from_bytes(chunk[4:], "little")
+            if chunk[:4] == b"EXIF":
+                return f.read(size)
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def _piexif_datetime(image_path) -> datetime | None:
+    """Read the EXIF datetime with piexif. Raises if piexif can't parse the file."""
+    if Path(image_path).suffix.lower() == ".webp":
+        data = _webp_exif_chunk(image_path)
+        if not data:
+            return None
+        exif = piexif.load(data if data[:2] in (b"II", b"MM") or data[:4] == b"Exif" else b"Exif\x00\x00" + data)
+    else:
+        exif = piexif.load(str(image_path))
+    candidates = [
+        exif.get("Exif", {}).get(piexif.ExifIFD.DateTimeOriginal),
+        exif.get("Exif", {}).get(piexif.ExifIFD.DateTimeDigitized),
+        exif.get("0th", {}).get(piexif.ImageIFD.DateTime),
+    ]
+    for val in candidates:
+        if not val:
+            continue
+        if isinstance(val, bytes):
+            val = val.decode("utf-8", errors="ignore")
+        try:
+            return datetime.strptime(str(val).strip().rstrip("\x00"), "%Y:%m:%d %H:%M:%S")
+        except Exception:
+            continue
+    return None
+
+
+def _fast_exif_datetime(image_path):
+    """Try the piexif fast path. Returns (handled, datetime_or_None)."""
+    if piexif is None or Path(image_path).suffix.lower() not in _PIEXIF_SUFFIXES:
+        return False, None
     try:
-        with Image.open(image_path) as img:
-            exif = None
-            try:
-                exif = img.getexif()
-            except Exception:
-                exif = None
+        return True, _piexif_datetime(image_path)
+    except Exception:
+        return False, None
 
-            if exif:
-                # Try to get DateTimeOriginal (when photo was taken)
-                for tag_id in [36867, 36868, 306]:  # DateTimeOriginal, DateTimeDigitized, DateTime
-                    try:
-                        if tag_id not in exif:
-                            continue
-                        date_str = exif.get(tag_id)
-                        if not date_str:
-                            continue
-                        if isinstance(date_str, bytes):
-                            date_str = date_str.decode("utf-8", errors="ignore")
-                        date_str = str(date_str).strip()
-                        # Parse EXIF date format: "YYYY:MM:DD HH:MM:SS"
-                        return datetime.strptime(date_str, "%Y:%m:%d %H:%M:%S")
-                    except Exception:
-                        continue
 
-            # Some images may have EXIF bytes; try to parse known tags via mapping (best-effort)
-            try:
-                raw = getattr(img, "_getexif", None)
-                exif_data = raw() if callable(raw) else None
-                if exif_data:
-                    for tag_id in [36867, 36868, 306]:
-                        if tag_id in exif_data:
-                            date_str = exif_data[tag_id]
-                            if isinstance(date_str, bytes):
-                                date_str = date_str.decode("utf-8", errors="ignore")
-                            date_str = str(date_str).strip()
-                            return datetime.strptime(date_str, "%Y:%m:%d %H:%M:%S")
-            except Exception:
-                pass
-    except Exception as e:
-        print(f"Error reading EXIF data: {e}")
-    
-    # Fallback to file modification time
-    return datetime.fromtimestamp(os.path.getmtime(image_path))
+def get_image_date(image_path):
+    """Extract photo shot date from EXIF data, falling back to the file mtime."""
+    return _get_exif_datetime(image_path) or datetime.fromtimestamp(os.path.getmtime(image_path))
 
 
 def _get_exif_datetime(image_path) -> datetime | None:
     """Return EXIF DateTimeOriginal/DateTimeDigitized/DateTime if present, else None."""
+    handled, dt = _fast_exif_datetime(image_path)
+    if handled:
+        return dt
     try:
-        with Image.open(image_path) as img:
-            exif = None
-            try:
-                exif = img.getexif()
-            except Exception:
-                exif = None
-
-            if exif:
-                for tag_id in [36867, 36868, 306]:
-                    val = exif.get(tag_id)
-                    if not val:
-                        continue
-                    if isinstance(val, bytes):
-                        val = val.decode("utf-8", errors="ignore")
-                    s = str(val).strip()
-                    try:
-                        return datetime.strptime(s, "%Y:%m:%d %H:%M:%S")
-                    except Exception:
-                        continue
-
-            # fallback: _getexif()
-            raw = getattr(img, "_getexif", None)
-            exif_data = raw() if callable(raw) else None
-            if exif_data:
-                for tag_id in [36867, 36868, 306]:
-                    if tag_id not in exif_data:
-                        continue
-                    val = exif_data.get(tag_id)
-                    if isinstance(val, bytes):
-                        val = val.decode("utf-8", errors="ignore")
-                    s = str(val).strip()
-                    try:
-                        return datetime.strptime(s, "%Y:%m:%d %H:%M:%S")
-                    except Exception:
-                        continue
+        with _open_mapped(image_path) as img:
+            exif = img.getexif()
+            # DateTimeOriginal/DateTimeDigitized live in the Exif sub-IFD, DateTime in IFD0.
+            exif_ifd = exif.get_ifd(0x8769)
+            for tags, tag_id in ((exif_ifd, 36867), (exif_ifd, 36868), (exif, 306)):
+                val = tags.get(tag_id)
+                if not val:
+                    continue
+                if isinstance(val, bytes):
+                    val = val.decode("utf-8", errors="ignore")
+                try:
+                    # EXIF date format: "YYYY:MM:DD HH:MM:SS"
+                    return datetime.strptime(str(val).strip().rstrip("\x00"), "%Y:%m:%d %H:%M:%S")
+                except Exception:
+                    continue
     except Exception:
         return None
     return None
@@ -544,17 +1291,18 @@ def _extract_datetime_from_id(image_id: str):
     """Best-effort parse of YYYYMMDD_HHMMSS from generated ids."""
     try:
         parts = (image_id or "").split("_")
-        if len(parts) < 2:
+        # Cheap shape check first: raising ValueError per foreign id costs more than the parse.
+        if len(parts) < 2 or not (parts[0].isdigit() and parts[1].isdigit()):
             return None
         return datetime.strptime(f"{parts[0]}_{parts[1]}", "%Y%m%d_%H%M%S")
-    except Exception:
+    except ValueError:
         return None
 
 
 def _build_image_payload(image_id: str) -> dict | None:
     """Best-effort metadata for a single image id."""
-    files = _find_files_by_id(image_id)
-    if not files:
+    formats = _find_formats_by_id(image_id)
+    if not formats:
         return None
 
     meta = _load_meta()
@@ -573,11 +1321,16 @@ def _build_image_payload(image_id: str) -> dict | None:
     if dt_obj and not dt_str:
         dt_str = dt_obj.strftime("%Y-%m-%d %H:%M:%S")
 
-    src = _pick_source_file(image_id)
+    webp = formats.get(".webp")
+    avif = formats.get(".avif")
     date_str = dt_obj.strftime("%Y-%m-%d") if dt_obj else None
-    if not date_str and src and src.exists():
-        date_str = datetime.fromtimestamp(src.stat().st_mtime).strftime("%Y-%m-%d")
-
+    if not date_str:
+        src = _pick_from_formats(formats)
+        try:
+            date_str = datetime.fromtimestamp(src.stat().st_mtime).strftime("%Y-%m-%d")
+        except OSError:
+            pass
+
     def _rel(p: Path | None) -> str | None:
         if not p:
             return None
@@ -586,11 +1339,9 @@ def _build_image_payload(image_id: str) -> dict | None:
         except Exception:
             return None
 
-    webp = next((p for p in files if p.suffix.lower() == ".webp"), None)
-    avif = next((p for p in files if p.suffix.lower() == ".avif"), None)
-
-    album_id = _get_image_album_id(image_id)
-    album_name = _get_album_name(album_id)
+    # Reuse the meta snapshot loaded above for the album lookups.
+    album_id = _get_image_album_id(image_id, meta)
+    album_name = _get_album_name(album_id, meta)
 
     return {
         "id": image_id,
@@ -677,7 +1428,7 @@ def admin_albums():
     if auth:
         return auth
 
-    meta = _load_meta()
+    meta = _load_meta_for_update()
     if not isinstance(meta, dict):
         meta = {}
     albums = _meta_get_albums(meta)
@@ -720,7 +1471,7 @@ def admin_albums():
         "created_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
     }
     meta["albums"] = albums
-    _save_meta(meta)
+    _save_meta(meta, flush=True)
 
     return jsonify({"id": aid, "name": name}), 201
 
@@ -732,7 +1483,7 @@ def admin_album_update(album_id):
         return auth
 
     album_id = str(Path(album_id).name)
-    meta = _load_meta()
+    meta = _load_meta_for_update()
     if not isinstance(meta, dict):
         meta = {}
     albums = _meta_get_albums(meta)
@@ -750,7 +1501,7 @@ def admin_album_update(album_id):
                 if str(aid) == album_id:
                     image_album.pop(img_id, None)
             meta["image_album"] = image_album
-        _save_meta(meta)
+        _save_meta(meta, flush=True)
         return jsonify({"ok": True}), 200
 
     body = request.get_json(silent=True) or {}
@@ -773,7 +1524,7 @@ def admin_album_update(album_id):
 
     albums[album_id] = a
     meta["albums"] = albums
-    _save_meta(meta)
+    _save_meta(meta, flush=True)
     return jsonify({"id": album_id, "name": a.get("name") or album_id}), 200
 
 
@@ -794,7 +1545,7 @@ def admin_set_image_album(image_id):
     if album_id in (None, "", "public"):
         album_id = None
 
-    meta = _load_meta()
+    meta = _load_meta_for_update()
     if not isinstance(meta, dict):
         meta = {}
     albums = _meta_get_albums(meta)
@@ -809,59 +1560,221 @@ def admin_set_image_album(image_id):
         image_album[image_id] = album_id
 
     meta["image_album"] = image_album
-    _save_meta(meta)
+    _save_meta(meta, flush=True)
 
     return jsonify({"id": image_id, "album_id": album_id, "album_name": _get_album_name(album_id)}), 200
 
+def _encode_capped(img: Image.Image, fmt: str, qualities, max_bytes: int, probe_opts=None, **opts) -> BytesIO:
+    """Encode at the highest quality (from a descending ladder) that fits max_bytes.
+
+    Tries the top quality first (usually fits), then binary-searches the rest.
+    Falls back to the lowest quality if nothing fits. With probe_opts (e.g. a faster
+    WebP method) the search encodes are cheap probes and only the chosen quality is
+    re-encoded with opts; the probe is kept if that final encode comes out larger.
+    """
+    qualities = list(qualities)
+
+    def _encode(q, encode_opts):
+        buf = BytesIO()
+        img.save(buf, fmt, quality=q, **encode_opts)
+        return buf
+
+    best = _encode(qualities[0], opts)
+    if best.tell() <= max_bytes or len(qualities) == 1:
+        return best
+
+    search_opts = opts if probe_opts is None else {**opts, **probe_opts}
+    lo, hi = 1, len(qualities) - 1
+    best = best_q = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        buf = _encode(qualities[mid], search_opts)
+        if buf.tell() <= max_bytes:
+            best, best_q = buf, qualities[mid]
+            hi = mid - 1
+        else:
+            # When nothing fits, the search ends on the lowest quality: keep that one.
+            lo = mid + 1
+            if mid == len(qualities) - 1:
+                best, best_q = buf, qualities[mid]
+
+    if probe_opts is not None:
+        final = _encode(best_q, opts)
+        # Keep the final encode if it fits (or, when nothing fits, isn't larger than the probe).
+        if final.tell() <= max(best.tell(), max_bytes):
+            return final
+    return best
+
+
 def convert_and_save_image(image_path, output_dir, base_name):
-    """Convert image (including RAW, if supported) to WebP and AVIF, capped ~1MB each."""
+    """Convert image (including RAW, if supported) to WebP and AVIF, capped ~1MB each, plus its thumbnail."""
     results = {}
     MAX_OUTPUT_SIZE = 1024 * 1024  # 1MB
 
-    img = _open_image_any(image_path)
-    try:
+    with _open_image_any(image_path) as img:
         img = _apply_exif_orientation(img)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
+        img = _to_rgb_on_white(img)
 
+        # One decoded image feeds every encode below, with no copy(): save() never mutates it,
+        # and only the thumbnail step (last) resizes in place. Keep it that way.
         webp_path = output_dir / f"{base_name}.webp"
-        quality = 70
-        while quality >= 50:
-            buf = BytesIO()
-            img.save(buf, 'WEBP', quality=quality, method=6)
-            if buf.tell() <= MAX_OUTPUT_SIZE or quality <= 50:
-                webp_path.write_bytes(buf.getvalue())
-                break
-            quality -= 5
+        buf = _encode_capped(img, 'WEBP', range(70, 49, -5), MAX_OUTPUT_SIZE, probe_opts={'method': 0}, method=6)
+        _write_atomic(webp_path, buf.getbuffer())
         results['webp'] = str(webp_path.relative_to(PHOTO_DIR))
 
         try:
             avif_path = output_dir / f"{base_name}.avif"
-            quality = 80
-            while quality >= 50:
-                buf = BytesIO()
-                img.save(buf, 'AVIF', quality=quality)
-                if buf.tell() <= MAX_OUTPUT_SIZE or quality <= 50:
-                    avif_path.write_bytes(buf.getvalue())
-                    break
-                quality -= 5
+            # Search at libaom's fastest speed; only the pick is encoded at speed 6.
+            buf = _encode_capped(img, 'AVIF', range(80, 49, -5), MAX_OUTPUT_SIZE, probe_opts={'speed': 10}, speed=6, subsampling="4:2:0")
+            _write_atomic(avif_path, buf.getbuffer())
             results['avif'] = str(avif_path.relative_to(PHOTO_DIR))
         except Exception as e:
             print(f"AVIF conversion failed: {e}. AVIF support may not be available.")
             results['avif'] = None
-    finally:
+
+        # Medium rendition: source for thumbnails regenerated later (e.g. after a cache purge).
+        # Skipped when the photo is already that small.
+        thumb_src = img
+        if max(img.size) > _MEDIUM_MAX_SIDE:
+            scale = _MEDIUM_MAX_SIDE / max(img.size)
+            thumb_src = img.resize(
+                (max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                Image.Resampling.LANCZOS,
+            )
+            try:
+                buf = BytesIO()
+                thumb_src.save(buf, 'WEBP', quality=70, method=4)
+                _write_atomic(_medium_path(base_name), buf.getbuffer())
+            except Exception as e:
+                app.logger.warning("Medium rendition failed for %s: %s", base_name, e)
+
+        # Reuse the decoded pixels for the thumbnails (WebP, and AVIF when supported) instead
+        # of decoding again on the first grid request. Last step: it resizes its input in place.
+        _ensure_thumbnail_from_image(base_name, thumb_src)
+
+    return results
+
+def _save_upload_stream(file, temp_path: Path, max_size: int = MAX_FILE_SIZE) -> tuple[int, str]:
+    """Write an uploaded file to disk, hashing it in the same pass. Returns (size, short hash).
+
+    Stops copying once the file exceeds max_size (the returned size is then > max_size), which
+    saves the disk write; Werkzeug has already received the file by then.
+    """
+    # 6-byte BLAKE2b digest -> same 12 hex chars the ids have always used.
+    h = hashlib.blake2b(digest_size=6)
+    size = 0
+    with open(temp_path, "wb") as f:
+        while True:
+            chunk = file.stream.read(1 << 20)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                break
+            h.update(chunk)
+            f.write(chunk)
+    return size, h.hexdigest()
+
+
+# Process pool for WebP/AVIF encoding of multi-file uploads (created on first use).
+_UPLOAD_POOL = None
+_UPLOAD_POOL_LOCK = threading.Lock()
+_UPLOAD_POOL_MIN_FILES = 3  # smaller batches convert inline; not worth the IPC
+# Every server worker process gets its own pool, so keep it small and drop it when idle.
+_UPLOAD_POOL_MAX_WORKERS = min(int(os.environ.get("MIO_GALLERY_UPLOAD_WORKERS", "4")), os.cpu_count() or 1)
+_UPLOAD_POOL_IDLE = 60.0  # seconds without an upload batch before the workers are shut down
+_UPLOAD_POOL_USERS = 0  # batches currently converting in the pool
+_UPLOAD_POOL_TIMER = None
+
+
+def _get_upload_pool() -> ProcessPoolExecutor:
+    """Return the pool, creating it if needed. Pair every call with _release_upload_pool()."""
+    global _UPLOAD_POOL, _UPLOAD_POOL_USERS, _UPLOAD_POOL_TIMER
+    with _UPLOAD_POOL_LOCK:
+        if _UPLOAD_POOL_TIMER is not None:
+            _UPLOAD_POOL_TIMER.cancel()
+            _UPLOAD_POOL_TIMER = None
+        if _UPLOAD_POOL is None:
+            # spawn: forking a threaded server process is not safe.
+            _UPLOAD_POOL = ProcessPoolExecutor(
+                max_workers=max(1, _UPLOAD_POOL_MAX_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        _UPLOAD_POOL_USERS += 1
+        return _UPLOAD_POOL
+
+
+def _release_upload_pool() -> None:
+    global _UPLOAD_POOL_USERS, _UPLOAD_POOL_TIMER
+    with _UPLOAD_POOL_LOCK:
+        _UPLOAD_POOL_USERS -= 1
+        if _UPLOAD_POOL_USERS == 0 and _UPLOAD_POOL is not None and _UPLOAD_POOL_TIMER is None:
+            timer = threading.Timer(_UPLOAD_POOL_IDLE, _shutdown_idle_upload_pool)
+            timer.daemon = True
+            timer.start()
+            _UPLOAD_POOL_TIMER = timer
+
+
+def _shutdown_idle_upload_pool() -> None:
+    global _UPLOAD_POOL, _UPLOAD_POOL_TIMER
+    with _UPLOAD_POOL_LOCK:
+        _UPLOAD_POOL_TIMER = None
+        # A batch started after the timer fired: it keeps the pool.
+        if _UPLOAD_POOL_USERS:
+            return
+        pool, _UPLOAD_POOL = _UPLOAD_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def _reset_upload_pool() -> None:
+    global _UPLOAD_POOL
+    with _UPLOAD_POOL_LOCK:
+        pool, _UPLOAD_POOL = _UPLOAD_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _convert_upload_inline(args):
+    try:
+        return convert_and_save_image(*args)
+    except Exception as e:
+        return e
+
+
+def _convert_uploads(jobs: list[dict]) -> list:
+    """Run convert_and_save_image for each job, in order. Failures are returned as exceptions."""
+    args = [(job['temp_path'], job['year_month_dir'], job['base_name']) for job in jobs]
+    if len(args) < _UPLOAD_POOL_MIN_FILES:
+        return [_convert_upload_inline(a) for a in args]
+
+    try:
+        pool = _get_upload_pool()
+    except Exception:
+        app.logger.exception("Upload pool unavailable; converting inline")
+        return [_convert_upload_inline(a) for a in args]
+
+    try:
         try:
-            img.close()
+            futures = [pool.submit(convert_and_save_image, *a) for a in args]
         except Exception:
-            pass
+            app.logger.exception("Upload pool unavailable; converting inline")
+            _reset_upload_pool()
+            return [_convert_upload_inline(a) for a in args]
+
+        outcomes = []
+        for a, fut in zip(args, futures):
+            try:
+                outcomes.append(fut.result())
+            except BrokenProcessPool:
+                _reset_upload_pool()
+                outcomes.append(_convert_upload_inline(a))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+    finally:
+        _release_upload_pool()
 
-    return results
 
 @app.route('/api/upload', methods=['POST'])
 def upload_image():
@@ -895,6 +1808,7 @@ def upload_image():
     
     results = []
     errors = []
+    jobs = []
     
     for file in files:
         if file.filename == '':
@@ -910,13 +1824,14 @@ def upload_image():
             errors.append({'filename': file.filename, 'error': 'RAW support requires rawpy to be installed on the server'})
             continue
         
+        temp_path = None
         try:
-            # Save original file temporarily
-            temp_path = PHOTO_DIR / f"temp_{secure_filename(file.filename)}"
-            file.save(temp_path)
+            # Save original file temporarily (unique name: a batch may repeat filenames)
+            temp_path = PHOTO_DIR / f"temp_{secrets.token_hex(4)}_{secure_filename(file.filename)}"
+            size, file_hash = _save_upload_stream(file, temp_path)
             
             # Check file size
-            if os.path.getsize(temp_path) > MAX_FILE_SIZE:
+            if size > MAX_FILE_SIZE:
                 os.remove(temp_path)
                 errors.append({'filename': file.filename, 'error': 'File too large (max 50MB)'})
                 continue
@@ -930,37 +1845,59 @@ def upload_image():
             year_month_dir.mkdir(parents=True, exist_ok=True)
             
             # Generate unique filename using hash
-            with open(temp_path, 'rb') as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()[:12]
-            
             base_name = f"{photo_date.strftime('%Y%m%d_%H%M%S')}_{file_hash}"
-            
-            # Convert and save
-            converted_paths = convert_and_save_image(temp_path, year_month_dir, base_name)
-
-            # Persist datetime for display (EXIF preferred; upload time fallback)
-            meta = _load_meta()
-            if not isinstance(meta, dict):
-                meta = {}
-            dt_map = meta.get("datetime")
-            if not isinstance(dt_map, dict):
-                dt_map = {}
-            dt_map[base_name] = photo_date.strftime("%Y-%m-%d %H:%M:%S")
-            meta["datetime"] = dt_map
-
-            # Persist album assignment (optional)
-            if upload_album_id is not None:
-                image_album = _meta_get_image_album(meta)
-                image_album[base_name] = upload_album_id
-                meta["image_album"] = image_album
-
-            _save_meta(meta)
-            
-            # Remove temp file
-            os.remove(temp_path)
+
+            jobs.append({
+                'filename': file.filename,
+                'temp_path': temp_path,
+                'photo_date': photo_date,
+                'year_month_dir': year_month_dir,
+                'base_name': base_name,
+            })
+        except Exception as e:
+            if temp_path is not None and temp_path.exists():
+                os.remove(temp_path)
+            errors.append({'filename': file.filename, 'error': str(e)})
+
+    # Record datetime and album before any file lands in photo/: another worker (or a
+    # listing revalidation) may pick the files up as soon as they exist, and must not see
+    # them as public in the meantime. One meta copy for the whole batch.
+    meta = _load_meta_for_update() if jobs else {}
+    dt_map = meta.get("datetime")
+    if not isinstance(dt_map, dict):
+        dt_map = {}
+    image_album = _meta_get_image_album(meta)
+    prior = {}  # base_name -> (datetime, album) before this upload, restored on failure
+    for job in jobs:
+        base_name = job['base_name']
+        prior.setdefault(base_name, (dt_map.get(base_name), image_album.get(base_name)))
+        # Persist datetime for display (EXIF preferred; upload time fallback)
+        dt_map[base_name] = job['photo_date'].strftime("%Y-%m-%d %H:%M:%S")
+        # Persist album assignment (optional)
+        if upload_album_id is not None:
+            image_album[base_name] = upload_album_id
+    if jobs:
+        meta["datetime"] = dt_map
+        if upload_album_id is not None:
+            meta["image_album"] = image_album
+        _save_meta(meta, flush=True)
+
+    # Convert and save (in parallel for larger batches)
+    outcomes = _convert_uploads(jobs)
+
+    added = []
+    failed = set()
+
+    for job, converted_paths in zip(jobs, outcomes):
+        base_name = job['base_name']
+        photo_date = job['photo_date']
+        try:
+            if isinstance(converted_paths, Exception):
+                raise converted_paths
+            added.append((base_name, converted_paths))
             
             results.append({
-                'original_filename': file.filename,
+                'original_filename': job['filename'],
                 'date': photo_date.strftime("%Y-%m-%d"),
                 'datetime': photo_date.strftime("%Y-%m-%d %H:%M:%S"),
                 'webp': f"/api/images/{converted_paths['webp']}",
@@ -968,9 +1905,38 @@ def upload_image():
             })
             
         except Exception as e:
-            if temp_path.exists():
-                os.remove(temp_path)
-            errors.append({'filename': file.filename, 'error': str(e)})
+            failed.add(base_name)
+            errors.append({'filename': job['filename'], 'error': str(e)})
+        finally:
+            # Remove temp file
+            if job['temp_path'].exists():
+                os.remove(job['temp_path'])
+
+    # Drop the entries recorded for files that never made it (unless the same image also
+    # converted in this batch); an image that already existed gets its old values back.
+    failed.difference_update(base_name for base_name, _ in added)
+    if failed:
+        meta = _load_meta_for_update()
+        dt_map = meta.get("datetime") if isinstance(meta.get("datetime"), dict) else {}
+        image_album = _meta_get_image_album(meta)
+        for base_name in failed:
+            old_dt, old_album = prior[base_name]
+            if old_dt is None:
+                dt_map.pop(base_name, None)
+            else:
+                dt_map[base_name] = old_dt
+            if old_album is None:
+                image_album.pop(base_name, None)
+            else:
+                image_album[base_name] = old_album
+        meta["datetime"] = dt_map
+        meta["image_album"] = image_album
+        _save_meta(meta, flush=True)
+    # Listed only once their album assignment is in place.
+    for base_name, converted_paths in added:
+        _index_add_files(base_name, [PHOTO_DIR / rel for rel in converted_paths.values() if rel])
+        _AVIF_THUMB_FAILED.pop(base_name, None)  # re-upload: its thumbnails were just rewritten
+        _queue_download_jpg(base_name)
     
     response = {'uploaded': results}
     if errors:
@@ -979,6 +1945,159 @@ def upload_image():
     status_code = 200 if results else 400
     return jsonify(response), status_code
 
+def _photo_url(p: Path | None) -> str | None:
+    # Index paths are always photo/YYYY/MM/<file>.
+    return f"/api/images/{p.parent.parent.name}/{p.parent.name}/{p.name}" if p else None
+
+
+def _walk_image_groups(start_dt=None, end_dt=None):
+    """Yield (base_name, {'webp', 'avif', 'date'}) for photo/YYYY/MM months in range, from the id index.
+
+    The dicts are cached between requests: read-only.
+    """
+    # Month buckets as year*12 + month-1 so the range check is a plain int compare.
+    start_ym = start_dt.year * 12 + start_dt.month - 1 if start_dt else None
+    end_ym = end_dt.year * 12 + end_dt.month - 1 if end_dt else None
+
+    groups = []
+    seen = set()
+    with _ID_INDEX_LOCK:
+        _revalidate_id_index()
+        for month_path, ids in _ID_INDEX_MONTHS.items():
+            year_path, month = os.path.split(month_path)
+            year = os.path.basename(year_path)
+            # Check if this month is in date range
+            if not (year.isdigit() and month.isdigit() and 1 <= int(month) <= 12):
+                continue
+            ym = int(year) * 12 + int(month) - 1
+            if start_ym is not None and ym < start_ym:
+                continue
+            if end_ym is not None and ym > end_ym:
+                continue
+
+            for base_name in ids:
+                if base_name in seen:
+                    continue
+                entry = _ID_LIST_ENTRIES.get(base_name)
+                if entry is None:
+                    formats = _ID_INDEX.get(base_name)
+                    if not formats:
+                        continue
+                    # Extract date from filename
+                    try:
+                        date_str = datetime.strptime(base_name.split('_')[0], "%Y%m%d").strftime("%Y-%m-%d")
+                    except ValueError:
+                        date_str = f"{year}-{month}-01"
+                    entry = _ID_LIST_ENTRIES[base_name] = {
+                        'webp': _photo_url(formats.get('.webp')),
+                        'avif': _photo_url(formats.get('.avif')),
+                        'date': date_str,
+                    }
+                seen.add(base_name)
+                groups.append((base_name, entry))
+    # Built under the lock, yielded outside it: callers do per-image work between items.
+    yield from groups
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _listing_dates(dt_str: str | None, base_name: str, fallback_date: str | None) -> tuple[str | None, str | None]:
+    """(date, datetime) strings for a list entry: meta datetime, else the id's timestamp, else fallback.
+
+    Pure function of its inputs, memoized: listings would otherwise strptime/strftime every image per request.
+    """
+    dt_obj = None
+    if dt_str:
+        try:
+            dt_obj = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            dt_obj = None
+    if not dt_obj:
+        dt_obj = _extract_datetime_from_id(base_name)
+    if not dt_obj:
+        return fallback_date, dt_str
+    return dt_obj.strftime("%Y-%m-%d"), dt_obj.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _sort_images(images: list[dict]) -> None:
+    """Pinned first, then newest first, ties by id. Sorts in place.
+
+    Dates are zero-padded YYYY-MM-DD, so plain string order matches date order.
+    """
+    images.sort(key=lambda x: x.get('id') or "")
+    images.sort(key=lambda x: (bool(x.get('pinned')), x.get('date') or "1970-01-01"), reverse=True)
+
+
+def _parse_date_filters(start_date: str | None, end_date: str | None):
+    """Parse YYYY-MM-DD query values into (start_dt, end_dt); end is inclusive. Raises ValueError."""
+    start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+    end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59) if end_date else None
+    return start_dt, end_dt
+
+
+def _collect_images(start_dt, end_dt, visible=None) -> list[dict]:
+    """Sorted listing entries in the date range. visible(album_id) filters by album; None keeps everything."""
+    start_key = start_dt.strftime("%Y-%m-%d") if start_dt else None
+    end_key = end_dt.strftime("%Y-%m-%d") if end_dt else None
+
+    images = []
+    views = _meta_views()
+    pinned_map = views["pinned"]
+    datetime_map = views["datetime"]
+    image_album = views["image_album"]
+    album_names = views["album_names"]
+
+    for base_name, img_data in _walk_image_groups(start_dt, end_dt):
+        img_album_id = image_album.get(base_name)
+        if visible is not None and not visible(img_album_id):
+            continue
+
+        dt_str = datetime_map.get(base_name)
+        date_str, dt_display = _listing_dates(dt_str if isinstance(dt_str, str) else None, base_name, img_data.get('date'))
+
+        # Apply date range filter against best available date (zero-padded, so string order works)
+        if date_str:
+            if start_key and date_str < start_key:
+                continue
+            if end_key and date_str > end_key:
+                continue
+
+        images.append({
+            'id': base_name,
+            'date': date_str,
+            'datetime': dt_display,
+            'thumb': f"/api/thumb/{base_name}.webp",
+            'webp': img_data['webp'],
+            'avif': img_data['avif'],
+            'pinned': bool(pinned_map.get(base_name, False)),
+            'description': "",
+            'album_id': img_album_id,
+            'album_name': album_names.get(img_album_id) if img_album_id else None,
+        })
+
+    descriptions = _load_descriptions(img['id'] for img in images)
+    for img in images:
+        img['description'] = descriptions.get(img['id'], "")
+
+    _sort_images(images)
+    return images
+
+
+def _images_response(images: list[dict], start_date, end_date):
+    resp = jsonify({
+        'total': len(images),
+        'images': images,
+        'filters': {
+            'start_date': start_date,
+            'end_date': end_date
+        }
+    })
+    # Body-hash ETag: an unchanged gallery revalidates with a 304 and no re-download.
+    # private: the listing depends on the session's unlocked albums.
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+
 @app.route('/api/images', methods=['GET'])
 def get_images():
     """
@@ -992,155 +2111,28 @@ def get_images():
     end_date = request.args.get('end_date')
     album_filter = (request.args.get('album') or '').strip()
     
-    # Parse date filters
-    start_dt = None
-    end_dt = None
-    
     try:
-        if start_date:
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-        if end_date:
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-    except ValueError as e:
+        start_dt, end_dt = _parse_date_filters(start_date, end_date)
+    except ValueError:
         return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
-    
-    images = []
-    meta = _load_meta()
-    pinned_map = meta.get("pinned", {}) if isinstance(meta, dict) else {}
-    datetime_map = meta.get("datetime", {}) if isinstance(meta, dict) else {}
-    if not isinstance(datetime_map, dict):
-        datetime_map = {}
 
-    image_album = _meta_get_image_album(meta)
-    albums = _meta_get_albums(meta)
+    unlocked = _unlocked_album_ids()
 
     # Album access rules (IMPORTANT): behaves the same for admins and normal users.
     # Admin login should not automatically reveal private albums on the public gallery page.
-    if album_filter and album_filter not in ("all", "public"):
+    if album_filter == "public":
+        visible = lambda album_id: album_id is None
+    elif album_filter and album_filter != "all":
         # requesting a specific private album
-        if album_filter not in _unlocked_album_ids():
+        if album_filter not in unlocked:
             return jsonify({"error": "forbidden"}), 403
-    
-    # Walk through photo directory
-    for year_dir in sorted(PHOTO_DIR.iterdir()):
-        if not year_dir.is_dir() or year_dir.name.startswith('.'):
-            continue
-        
-        for month_dir in sorted(year_dir.iterdir()):
-            if not month_dir.is_dir() or month_dir.name.startswith('.'):
-                continue
-            
-            # Check if this month is in date range
-            try:
-                month_date = datetime.strptime(f"{year_dir.name}-{month_dir.name}", "%Y-%m")
-                if start_dt and month_date.replace(day=28) < start_dt.replace(day=1):
-                    continue
-                if end_dt and month_date.replace(day=1) > end_dt.replace(day=28):
-                    continue
-            except ValueError:
-                continue
-            
-            # Group images by base name
-            image_groups = {}
-            for img_file in sorted(month_dir.iterdir()):
-                if img_file.is_file() and not img_file.name.startswith('.'):
-                    base_name = img_file.stem
-                    ext = img_file.suffix[1:]  # Remove the dot
-                    
-                    if base_name not in image_groups:
-                        image_groups[base_name] = {'webp': None, 'avif': None, 'date': None}
-                    
-                    relative_path = img_file.relative_to(PHOTO_DIR)
-                    image_groups[base_name][ext] = f"/api/images/{relative_path}"
-                    
-                    # Extract date from filename
-                    if not image_groups[base_name]['date']:
-                        try:
-                            date_part = base_name.split('_')[0]
-                            img_date = datetime.strptime(date_part, "%Y%m%d")
-                            image_groups[base_name]['date'] = img_date.strftime("%Y-%m-%d")
-                        except:
-                            image_groups[base_name]['date'] = f"{year_dir.name}-{month_dir.name}-01"
-            
-            # Filter by exact date range and add to results
-            for base_name, img_data in image_groups.items():
-                img_album_id = None
-                try:
-                    img_album_id = image_album.get(base_name) if isinstance(image_album, dict) else None
-                    img_album_id = str(img_album_id).strip() if img_album_id else None
-                except Exception:
-                    img_album_id = None
-
-                # Normalize: unknown album ids => public
-                if img_album_id and img_album_id not in albums:
-                    img_album_id = None
-
-                # Enforce access (no admin bypass here)
-                if album_filter == "public":
-                    if img_album_id is not None:
-                        continue
-                elif album_filter and album_filter not in ("all", "public"):
-                    if img_album_id != album_filter:
-                        continue
-                else:
-                    if img_album_id is not None and img_album_id not in _unlocked_album_ids():
-                        continue
-
-                dt_str = datetime_map.get(base_name)
-                dt_obj = None
-                if dt_str:
-                    try:
-                        dt_obj = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-                    except Exception:
-                        dt_obj = None
-                if not dt_obj:
-                    dt_obj = _extract_datetime_from_id(base_name)
-
-                date_str = img_data.get('date')
-                if dt_obj:
-                    date_str = dt_obj.strftime("%Y-%m-%d")
-
-                # Apply date range filter against best available date
-                try:
-                    img_date = datetime.strptime(date_str, "%Y-%m-%d")
-                    if start_dt and img_date < start_dt:
-                        continue
-                    if end_dt and img_date > end_dt:
-                        continue
-                except Exception:
-                    pass
-
-                images.append({
-                    'id': base_name,
-                    'date': date_str,
-                    'datetime': dt_obj.strftime("%Y-%m-%d %H:%M:%S") if dt_obj else dt_str,
-                    'thumb': f"/api/thumb/{base_name}.webp",
-                    'webp': img_data['webp'],
-                    'avif': img_data['avif'],
-                    'pinned': bool(pinned_map.get(base_name, False)),
-                    'description': _load_description(base_name),
-                    'album_id': img_album_id,
-                    'album_name': (albums.get(img_album_id) or {}).get('name') if img_album_id and isinstance(albums.get(img_album_id), dict) else None,
-                })
-
-    # Pinned first, then newest first (best effort)
-    def _sort_key(x):
-        try:
-            d = datetime.strptime(x.get('date') or "1970-01-01", "%Y-%m-%d")
-        except Exception:
-            d = datetime(1970, 1, 1)
-        return (0 if x.get('pinned') else 1, -int(d.timestamp()), x.get('id') or "")
+        visible = lambda album_id: album_id == album_filter
+    else:
+        # Enforce access (no admin bypass here)
+        visible = lambda album_id: album_id is None or album_id in unlocked
 
-    images.sort(key=_sort_key)
-    
-    return jsonify({
-        'total': len(images),
-        'images': images,
-        'filters': {
-            'start_date': start_date,
-            'end_date': end_date
-        }
-    })
+    images = _collect_images(start_dt, end_dt, visible)
+    return _images_response(images, start_date, end_date)
 
 
 @app.route('/api/admin/images', methods=['GET'])
@@ -1153,124 +2145,13 @@ def admin_get_images():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
 
-    # Parse date filters
-    start_dt = None
-    end_dt = None
-
     try:
-        if start_date:
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-        if end_date:
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+        start_dt, end_dt = _parse_date_filters(start_date, end_date)
     except ValueError:
         return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
 
-    images = []
-    meta = _load_meta()
-    pinned_map = meta.get("pinned", {}) if isinstance(meta, dict) else {}
-    datetime_map = meta.get("datetime", {}) if isinstance(meta, dict) else {}
-    if not isinstance(datetime_map, dict):
-        datetime_map = {}
-
-    image_album = _meta_get_image_album(meta)
-    albums = _meta_get_albums(meta)
-
-    for year_dir in sorted(PHOTO_DIR.iterdir()):
-        if not year_dir.is_dir() or year_dir.name.startswith('.'):
-            continue
-        for month_dir in sorted(year_dir.iterdir()):
-            if not month_dir.is_dir() or month_dir.name.startswith('.'):
-                continue
-
-            try:
-                month_date = datetime.strptime(f"{year_dir.name}-{month_dir.name}", "%Y-%m")
-                if start_dt and month_date.replace(day=28) < start_dt.replace(day=1):
-                    continue
-                if end_dt and month_date.replace(day=1) > end_dt.replace(day=28):
-                    continue
-            except ValueError:
-                continue
-
-            image_groups = {}
-            for img_file in sorted(month_dir.iterdir()):
-                if img_file.is_file() and not img_file.name.startswith('.'):
-                    base_name = img_file.stem
-                    ext = img_file.suffix[1:]
-                    if base_name not in image_groups:
-                        image_groups[base_name] = {'webp': None, 'avif': None, 'date': None}
-                    relative_path = img_file.relative_to(PHOTO_DIR)
-                    image_groups[base_name][ext] = f"/api/images/{relative_path}"
-                    if not image_groups[base_name]['date']:
-                        try:
-                            date_part = base_name.split('_')[0]
-                            img_date = datetime.strptime(date_part, "%Y%m%d")
-                            image_groups[base_name]['date'] = img_date.strftime("%Y-%m-%d")
-                        except Exception:
-                            image_groups[base_name]['date'] = f"{year_dir.name}-{month_dir.name}-01"
-
-            for base_name, img_data in image_groups.items():
-                img_album_id = None
-                try:
-                    img_album_id = image_album.get(base_name) if isinstance(image_album, dict) else None
-                    img_album_id = str(img_album_id).strip() if img_album_id else None
-                except Exception:
-                    img_album_id = None
-                if img_album_id and img_album_id not in albums:
-                    img_album_id = None
-
-                dt_str = datetime_map.get(base_name)
-                dt_obj = None
-                if dt_str:
-                    try:
-                        dt_obj = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-                    except Exception:
-                        dt_obj = None
-                if not dt_obj:
-                    dt_obj = _extract_datetime_from_id(base_name)
-
-                date_str = img_data.get('date')
-                if dt_obj:
-                    date_str = dt_obj.strftime("%Y-%m-%d")
-
-                try:
-                    img_date = datetime.strptime(date_str, "%Y-%m-%d")
-                    if start_dt and img_date < start_dt:
-                        continue
-                    if end_dt and img_date > end_dt:
-                        continue
-                except Exception:
-                    pass
-
-                images.append({
-                    'id': base_name,
-                    'date': date_str,
-                    'datetime': dt_obj.strftime("%Y-%m-%d %H:%M:%S") if dt_obj else dt_str,
-                    'thumb': f"/api/thumb/{base_name}.webp",
-                    'webp': img_data['webp'],
-                    'avif': img_data['avif'],
-                    'pinned': bool(pinned_map.get(base_name, False)),
-                    'description': _load_description(base_name),
-                    'album_id': img_album_id,
-                    'album_name': (albums.get(img_album_id) or {}).get('name') if img_album_id and isinstance(albums.get(img_album_id), dict) else None,
-                })
-
-    def _sort_key(x):
-        try:
-            d = datetime.strptime(x.get('date') or "1970-01-01", "%Y-%m-%d")
-        except Exception:
-            d = datetime(1970, 1, 1)
-        return (0 if x.get('pinned') else 1, -int(d.timestamp()), x.get('id') or "")
-
-    images.sort(key=_sort_key)
-
-    return jsonify({
-        'total': len(images),
-        'images': images,
-        'filters': {
-            'start_date': start_date,
-            'end_date': end_date
-        }
-    })
+    images = _collect_images(start_dt, end_dt)
+    return _images_response(images, start_date, end_date)
 
 
 @app.route('/api/images/<image_id>/pin', methods=['PUT'])
@@ -1285,7 +2166,7 @@ def pin_image(image_id):
         return jsonify({'error': 'Image not found'}), 404
 
     body = request.get_json(silent=True) or {}
-    meta = _load_meta()
+    meta = _load_meta_for_update()
     if not isinstance(meta, dict):
         meta = {}
     pinned_map = meta.get("pinned")
@@ -1360,12 +2241,27 @@ def delete_image(image_id):
     deleted = []
     for p in files:
         try:
-            deleted.append(str(p.relative_to(PHOTO_DIR)))
-            p.unlink()
-        except Exception:
-            pass
+            p.unlink(missing_ok=True)
+        except OSError as e:
+            app.logger.warning("Could not delete %s: %s", p, e)
+            continue
+        deleted.append(str(p.relative_to(PHOTO_DIR)))
+    # Derived files: description, thumbnails, medium rendition, cached JPG.
+    for p in (
+        _description_path(image_id),
+        _thumb_path(image_id),
+        _thumb_path(image_id, "avif"),
+        _medium_path(image_id),
+        _download_jpg_path(image_id),
+    ):
+        try:
+            p.unlink(missing_ok=True)
+        except OSError as e:
+            app.logger.warning("Could not delete %s: %s", p, e)
+    _index_forget(image_id)
+    _AVIF_THUMB_FAILED.pop(image_id, None)
 
-    meta = _load_meta()
+    meta = _load_meta_for_update()
     if isinstance(meta, dict):
         pinned_map = meta.get("pinned")
         if isinstance(pinned_map, dict):
@@ -1379,22 +2275,151 @@ def delete_image(image_id):
 
         _save_meta(meta)
 
+    return jsonify({'id': image_id, 'deleted': deleted}), 200
+
+
+def _render_download_jpg_vips(src: Path, tmp: Path) -> bool:
+    """Streamed libvips decode/flatten/encode. Returns False if vips can't handle src."""
+    if pyvips is None:
+        return False
     try:
-        _description_path(image_id).unlink(missing_ok=True)
+        # Sequential access streams in strips; stored files are already upright (orientation applied on upload).
+        v = pyvips.Image.new_from_file(str(src), access="sequential")
+        if v.hasalpha():
+            v = v.flatten(background=[255, 255, 255])
+        if v.interpretation != "srgb":
+            v = v.colourspace("srgb")
+        # Match the Pillow output: baseline, 4:2:0, no metadata.
+        v.jpegsave(str(tmp), Q=92, strip=True, subsample_mode="on")
+        return True
     except Exception:
-        pass
+        # e.g. no AVIF loader in this libvips build; fall back to Pillow.
+        tmp.unlink(missing_ok=True)
+        return False
 
+
+def _encode_jpg_cjpegli(img: Image.Image, tmp: Path) -> bool:
+    """Encode an RGB image with the cjpegli CLI (via a temp PPM). Returns False on failure."""
+    ppm = tmp.with_name(tmp.name + ".ppm")
     try:
-        _thumb_path(image_id).unlink(missing_ok=True)
-    except Exception:
-        pass
+        img.save(ppm, format="PPM")
+        subprocess.run([_CJPEGLI, str(ppm), str(tmp), "-q", "92"], check=True, capture_output=True, timeout=120)
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        app.logger.warning("cjpegli failed, falling back to Pillow: %s", e)
+        tmp.unlink(missing_ok=True)
+        return False
+    finally:
+        ppm.unlink(missing_ok=True)
+
+
+def _render_download_jpg(src: Path, out: Path) -> None:
+    """Write the JPG download rendition of src to out (atomically)."""
+    tmp = out.with_name(f"{out.name}.{secrets.token_hex(4)}.tmp")
+    # cjpegli gives smaller files than either in-process encoder, so it wins when installed.
+    if _CJPEGLI is None and _render_download_jpg_vips(src, tmp):
+        os.replace(tmp, out)
+        return
 
+    with Image.open(src) as img:
+        img = _apply_exif_orientation(img)
+        img = _to_rgb_on_white(img)
+
+        if _CJPEGLI is not None and _encode_jpg_cjpegli(img, tmp):
+            os.replace(tmp, out)
+            return
+
+        # Encoded once and cached in photo/download/, so favour encode speed:
+        # baseline JPEG is ~2x faster than optimize=True for a few % larger files.
+        # 1 MiB buffer: Pillow's encoder hands over 64 KiB blocks, so this batches the write syscalls.
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        with os.fdopen(fd, 'wb', buffering=1 << 20) as f:
+            img.save(f, format='JPEG', quality=92)
+        os.replace(tmp, out)
+
+
+# JPG renditions are rendered in the background right after upload.
+_JPG_EXECUTOR = None if _IN_UPLOAD_WORKER else ThreadPoolExecutor(max_workers=1, thread_name_prefix="jpg-rendition")
+_JPG_PENDING: dict[str, Future] = {}  # image id -> queued or running rendition job
+_JPG_PENDING_LOCK = threading.Lock()
+_JPG_WAIT_TIMEOUT = 3.0  # seconds a download waits on a running job before answering 503
+
+
+def _render_download_jpg_job(image_id: str) -> None:
     try:
-        _download_jpg_path(image_id).unlink(missing_ok=True)
+        src = _pick_source_file(image_id)
+        out = _download_jpg_path(image_id)
+        if src and src.exists() and not out.exists():
+            _render_download_jpg(src, out)
+            # Deleted while we were encoding: don't leave an orphan behind.
+            if not src.exists():
+                out.unlink(missing_ok=True)
     except Exception:
-        pass
+        app.logger.exception("JPG rendition failed for %s", image_id)
 
-    return jsonify({'id': image_id, 'deleted': deleted}), 200
+
+def _queue_download_jpg(image_id: str) -> None:
+    with _JPG_PENDING_LOCK:
+        if image_id in _JPG_PENDING:
+            return
+        try:
+            fut = _JPG_EXECUTOR.submit(_render_download_jpg_job, image_id)
+        except RuntimeError:
+            # Executor shut down (interpreter exiting); downloads fall back to rendering inline.
+            return
+        _JPG_PENDING[image_id] = fut
+
+    def _done(f, image_id=image_id):
+        with _JPG_PENDING_LOCK:
+            if _JPG_PENDING.get(image_id) is f:
+                del _JPG_PENDING[image_id]
+
+    # Outside the lock: runs right away if the job already finished (or was cancelled).
+    fut.add_done_callback(_done)
+
+
+def _x_accel_response(path: Path, as_attachment: bool = False, download_name: str | None = None, mimetype: str | None = None):
+    """Hand a file under photo/ to nginx via X-Accel-Redirect. None if not configured."""
+    if not X_ACCEL_PREFIX:
+        return None
+    try:
+        rel = path.relative_to(PHOTO_DIR)
+    except ValueError:
+        return None
+    resp = app.response_class(mimetype=mimetype or mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+    resp.headers["X-Accel-Redirect"] = f"{X_ACCEL_PREFIX}/{rel.as_posix()}"
+    if as_attachment:
+        resp.headers.set("Content-Disposition", "attachment", filename=download_name or path.name)
+    return resp
+
+
+PHOTO_MAX_AGE = 31536000  # seconds; image files are keyed by content hash and never rewritten
+# Only image renditions are immutable; anything else under photo/ (meta, descriptions) can change.
+_IMMUTABLE_SUFFIXES = {'.webp', '.avif', '.jpg'}
+
+
+def _send_photo(path: Path, image_id: str | None = None, **kwargs):
+    """send_file() for photo/ files, offloaded to the front-end server when configured."""
+    immutable = path.suffix.lower() in _IMMUTABLE_SUFFIXES
+    resp = _x_accel_response(path, kwargs.get("as_attachment", False), kwargs.get("download_name"), kwargs.get("mimetype"))
+    if resp is None:
+        # With MIO_GALLERY_X_SENDFILE=1, send_file() itself emits X-Sendfile instead of the body.
+        # conditional: ETag/Last-Modified (304s) plus Range/If-Range (206s, Accept-Ranges: bytes).
+        resp = send_file(path, conditional=True, etag=True, max_age=PHOTO_MAX_AGE if immutable else 0, **kwargs)
+        # No server file_wrapper (e.g. the dev server): werkzeug's fallback reads 8 KiB at a time.
+        if isinstance(resp.response, FileWrapper):
+            resp.response.buffer_size = 1 << 20
+    if not immutable:
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+    # Album images sit behind an unlock cookie: keep them out of shared caches.
+    scope = "private" if image_id and _get_image_album_id(image_id) else "public"
+    resp.headers["Cache-Control"] = f"{scope}, max-age={PHOTO_MAX_AGE}, immutable"
+    return resp
+
+
+# ?format= value -> normalized format; common spellings hit without lower().
+_DOWNLOAD_FORMATS = {'avif': 'avif', 'jpg': 'jpg', 'AVIF': 'avif', 'JPG': 'jpg'}
 
 
 @app.route('/api/images/<image_id>/download', methods=['GET'])
@@ -1404,60 +2429,85 @@ def download_image(image_id):
     if guard:
         return guard
 
-    files = _find_files_by_id(image_id)
-    if not files:
-        return jsonify({'error': 'Image not found'}), 404
-
-    fmt = (request.args.get('format') or 'avif').lower()
-    if fmt not in ('avif', 'jpg'):
+    # Reject bad formats before touching the index.
+    raw_fmt = request.args.get('format') or 'avif'
+    fmt = _DOWNLOAD_FORMATS.get(raw_fmt) or _DOWNLOAD_FORMATS.get(raw_fmt.lower())
+    if fmt is None:
         return jsonify({'error': 'Invalid format. Use avif|jpg'}), 400
 
+    formats = _find_formats_by_id(image_id)
+    if not formats:
+        return jsonify({'error': 'Image not found'}), 404
+
     if fmt == 'avif':
-        avif = next((p for p in files if p.suffix.lower() == '.avif'), None)
+        avif = formats.get('.avif')
         if not avif or not avif.exists():
             return jsonify({'error': 'AVIF not available'}), 404
-        return send_file(avif, as_attachment=True, download_name=f"{image_id}.avif")
+        return _send_photo(avif, image_id, as_attachment=True, download_name=f"{image_id}.avif")
 
     out = _download_jpg_path(image_id)
     if out.exists():
-        return send_file(out, as_attachment=True, download_name=f"{image_id}.jpg")
+        return _send_photo(out, image_id, as_attachment=True, download_name=f"{image_id}.jpg")
 
-    src = _pick_source_file(image_id)
+    with _JPG_PENDING_LOCK:
+        fut = _JPG_PENDING.get(image_id)
+    # Still queued behind other uploads: take it over and render inline below.
+    if fut is not None and not fut.cancel():
+        # Already running: wait for it rather than encoding the same file twice.
+        try:
+            fut.result(timeout=_JPG_WAIT_TIMEOUT)
+        except FutureTimeoutError:  # a distinct class from the builtin TimeoutError before Python 3.11
+            resp = jsonify({'error': 'JPG rendition pending'})
+            resp.headers['Retry-After'] = '5'
+            return resp, 503
+        if out.exists():
+            return _send_photo(out, image_id, as_attachment=True, download_name=f"{image_id}.jpg")
+
+    # Not queued (uploaded before renditions were precomputed, or the job failed): render inline.
+    src = _pick_from_formats(formats)
     if not src or not src.exists():
         return jsonify({'error': 'Source not available'}), 404
 
     try:
-        with Image.open(src) as img:
-            img = _apply_exif_orientation(img)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                bg = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                bg.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                img = bg
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            tmp = out.with_suffix(out.suffix + '.tmp')
-            img.save(tmp, format='JPEG', quality=92, optimize=True)
-            tmp.replace(out)
+        _render_download_jpg(src, out)
     except Exception as e:
         return jsonify({'error': f'JPG conversion failed: {e}'}), 500
 
-    return send_file(out, as_attachment=True, download_name=f"{image_id}.jpg")
+    return _send_photo(out, image_id, as_attachment=True, download_name=f"{image_id}.jpg")
+
+# Subtrees of photo/ that serve_image may read from, besides the photo/YYYY/MM image folders.
+_SERVED_SUBDIRS = {"thumb", "medium", "download", "description"}
+
+
+def _is_served_photo_path(filename: str) -> bool:
+    """True for photo/YYYY/MM/<file> and the rendition subtrees; never dotfiles (.meta.json, tmp files)."""
+    parts = filename.split("/")
+    # Checked before any normalization, so "description/../.meta.json" is refused too.
+    if any(not part or part.startswith(".") for part in parts):
+        return False
+    if parts[0] in _SERVED_SUBDIRS:
+        return len(parts) == 2
+    return len(parts) == 3 and len(parts[0]) == 4 and parts[0].isdigit() and len(parts[1]) == 2 and parts[1].isdigit()
+
 
 @app.route('/api/images/<path:filename>', methods=['GET'])
 def serve_image(filename):
     """Serve image files from photo directory"""
-    from flask import send_from_directory
-    file_path = PHOTO_DIR / filename
-    if file_path.exists() and file_path.is_file():
+    if not _is_served_photo_path(filename):
+        return jsonify({'error': 'Image not found'}), 404
+    safe = safe_join(_PHOTO_DIR_STR, filename)
+    try:
+        is_file = safe is not None and stat.S_ISREG(os.stat(safe).st_mode)
+    except OSError:
+        is_file = False
+    if is_file:
+        file_path = Path(safe)
         # enforce album access based on image id (filename stem)
         img_id = file_path.stem
         guard = _require_image_access_or_404(img_id)
         if guard:
             return guard
-        return send_from_directory(PHOTO_DIR, filename)
+        return _send_photo(file_path, img_id)
     return jsonify({'error': 'Image not found'}), 404
 
 @app.route('/api/health', methods=['GET'])
@@ -1467,26 +2517,3 @@ def health_check():
 
 if __name__ == '__main__':
     app.run(debug=debug_mode, host='0.0.0.0', port=5088)
-
-# Global error handler to log crashes and return consistent responses
-@app.errorhandler(Exception)
-def _handle_exception(e):
-    # HTTP errors: log and return as JSON for API routes; preserve HTML for pages
-    if isinstance(e, HTTPException):
-        try:
-            app.logger.warning("HTTPException %s on %s %s: %s", e.code, request.method, request.path, e.description)
-        except Exception:
-            pass
-        if request.path.startswith('/api/'):
-            return jsonify({'error': e.name.lower().replace(' ', '_'), 'message': e.description}), e.code
-        return e
-
-    # Unhandled exceptions: log stack trace
-    try:
-        app.logger.exception("Unhandled exception on %s %s", request.method, request.path)
-    except Exception:
-        pass
-
-    if request.path.startswith('/api/'):
-        return jsonify({'error': 'internal_error', 'message': 'Server error'}), 500
-    return "Internal Server Error", 500